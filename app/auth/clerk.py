@@ -1,19 +1,76 @@
+import hashlib
+import threading
+import time
 import requests
-from jose import jwk, jwt
-from jose.utils import base64url_decode
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import TTLCache
+import jwt
+from jwt.algorithms import RSAAlgorithm
 from fastapi import Depends, HTTPException, status, Request
 from functools import wraps
-from typing import Dict
+from typing import Any, Dict
 
 # Clerk configuration
 CLERK_JWKS_URL = "https://big-racer-91.clerk.accounts.dev/.well-known/jwks.json"
 
-# Cache the JWKS
-try:
-    jwks = requests.get(CLERK_JWKS_URL).json()["keys"]
-except Exception as e:
-    print(f"Error fetching JWKS: {str(e)}")
-    jwks = []
+# JWKS refresh policy: keys are reloaded every few hours, and on an unknown kid
+# at most once per minute so bogus tokens cannot hammer the JWKS endpoint.
+JWKS_REFRESH_INTERVAL = 6 * 60 * 60
+JWKS_MIN_REFETCH_INTERVAL = 60
+
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=2,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=(500, 502, 503, 504))
+))
+
+# (jwks, public keys constructed once per fetch keyed by kid, fetched_at)
+_jwks_cache = ([], {}, 0.0)
+_jwks_last_attempt = 0.0
+_jwks_lock = threading.Lock()
+
+def _load_jwks():
+    """Fetch the Clerk JWKS and construct its public keys."""
+    global _jwks_cache
+    response = _session.get(CLERK_JWKS_URL, timeout=2)
+    response.raise_for_status()
+    jwks = response.json()["keys"]
+    constructed_keys: Dict[str, Any] = {k["kid"]: RSAAlgorithm.from_jwk(k) for k in jwks}
+    _jwks_cache = (jwks, constructed_keys, time.time())
+
+def _get_public_key(kid: str):
+    """Return the constructed public key for kid, (re)loading the JWKS when needed."""
+    global _jwks_last_attempt
+    _, constructed_keys, fetched_at = _jwks_cache
+    public_key = constructed_keys.get(kid)
+    if public_key is not None and time.time() - fetched_at < JWKS_REFRESH_INTERVAL:
+        return public_key
+
+    with _jwks_lock:
+        # Another thread may have refreshed the keys while we were waiting
+        _, constructed_keys, fetched_at = _jwks_cache
+        now = time.time()
+        fresh = now - fetched_at < JWKS_REFRESH_INTERVAL
+        if (kid not in constructed_keys or not fresh) and now - _jwks_last_attempt >= JWKS_MIN_REFETCH_INTERVAL:
+            _jwks_last_attempt = now
+            try:
+                _load_jwks()
+            except Exception as e:
+                print(f"Error fetching JWKS: {str(e)}")
+        return _jwks_cache[1].get(kid)
+
+# Decoder configured once; keys come from RSAAlgorithm.from_jwk and are already
+# cryptography RSAPublicKey objects, so decode goes straight to the C verifier
+_jwt_decoder = jwt.PyJWT(options={"verify_aud": False})
+_JWT_ALGORITHMS = ["RS256"]
+
+# Cache of verified claims keyed by a hash of the raw token. Clerk session tokens
+# live about a minute, so a 60s TTL lets a token verify once over its lifetime;
+# the exp check below still refuses claims that have expired.
+_verified_tokens = TTLCache(maxsize=10_000, ttl=60)
+_verified_tokens_lock = threading.Lock()
 
 def verify_clerk_token(request: Request) -> Dict:
     """Verify Clerk JWT token and return user claims."""
@@ -21,26 +78,30 @@ def verify_clerk_token(request: Request) -> Dict:
     if not auth_header:
         raise HTTPException(status_code=401, detail="Authorization header missing")
 
-    token = auth_header.split(" ")[1]
-    headers = jwt.get_unverified_header(token)
+    # Work on bytes throughout: headers are latin-1 text, and PyJWT accepts bytes
+    token = auth_header.split(" ")[1].encode("latin-1")
+    cache_key = hashlib.blake2b(token, digest_size=16).digest()
+    with _verified_tokens_lock:
+        cached_claims = _verified_tokens.get(cache_key)
+    if cached_claims is not None and cached_claims.get("exp", 0) > time.time():
+        return cached_claims
 
-    key = None
-    for jwk_key in jwks:
-        if jwk_key["kid"] == headers["kid"]:
-            key = jwk_key
-            break
+    try:
+        headers = jwt.get_unverified_header(token)
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid token.")
 
-    if key is None:
+    public_key = _get_public_key(headers.get("kid"))
+    if public_key is None:
         raise HTTPException(status_code=401, detail="Public key not found.")
 
-    public_key = jwk.construct(key)
-    message, encoded_signature = str(token).rsplit(".", 1)
-    decoded_signature = base64url_decode(encoded_signature.encode())
-
-    if not public_key.verify(message.encode(), decoded_signature):
+    try:
+        claims = _jwt_decoder.decode(token, public_key, algorithms=_JWT_ALGORITHMS)
+    except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Signature verification failed.")
 
-    claims = jwt.get_unverified_claims(token)
+    with _verified_tokens_lock:
+        _verified_tokens[cache_key] = claims
     return claims  # Return full claims dict
 
      
@@ -1,5 +1,7 @@
 import os
+import asyncio
 from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from mangum import Mangum
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes import resume, search, email, background, screen
@@ -23,7 +25,8 @@ else:
 app = FastAPI(
     title="HireSenstry",
     description="AI-powered talent acquisition and screening platform",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Allow all origins (dev only, restrict in prod)
@@ -38,14 +41,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Routes that never need the caller's identity
+PUBLIC_PATHS = {"/", "/health", "/docs", "/redoc", "/openapi.json"}
+
 # Middleware to inject user ID
 @app.middleware("http")
 async def add_user_id(request: Request, call_next):
-    try:
-        claims = verify_clerk_token(request)
-        request.state.user_id = claims['sub']
-    except Exception:
-        request.state.user_id = None
+    request.state.user_id = None
+    # Skip token verification for CORS preflight, public routes and anonymous calls
+    if (request.method != "OPTIONS"
+            and request.url.path not in PUBLIC_PATHS
+            and "Authorization" in request.headers):
+        try:
+            claims = verify_clerk_token(request)
+            request.state.user_id = claims['sub']
+        except Exception:
+            pass
     response = await call_next(request)
     return response
 
@@ -58,6 +69,10 @@ async def startup_event():
         print(f"Error initializing database: {e}")
         raise
 
+    # Warm up the embedding model before the first request needs it; both routers'
+    # engines share the same process-wide model, so one warmup covers them
+    await asyncio.to_thread(search.search_engine.warmup)
+
 # Routers
 app.include_router(resume.router, prefix="/api/resume", tags=["resume"])
 app.include_router(search.router, prefix="/api/search", tags=["search"])
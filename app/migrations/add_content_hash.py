@@ -0,0 +1,47 @@
+from sqlalchemy import create_engine, text
+import os
+from pathlib import Path
+
+# Get the app directory path
+APP_DIR = Path(__file__).resolve().parent.parent
+ENV_PATH = APP_DIR / '.env'
+
+# Load environment variables
+if ENV_PATH.exists():
+    from dotenv import load_dotenv
+    load_dotenv(ENV_PATH)
+
+# Database connection
+DATABASE_URL = f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}"
+engine = create_engine(DATABASE_URL)
+
+def run_migration():
+    """Add the content_hash column used to deduplicate resume uploads."""
+    try:
+        with engine.connect() as connection:
+            result = connection.execute(text("""
+                SELECT COUNT(*)
+                FROM information_schema.columns
+                WHERE table_schema = :db_name
+                AND table_name = 'resumes'
+                AND column_name = 'content_hash'
+            """), {"db_name": os.getenv('DB_NAME')})
+
+            if result.scalar() == 0:
+                print("Adding content_hash column to resumes table...")
+                connection.execute(text("""
+                    ALTER TABLE resumes
+                    ADD COLUMN content_hash VARCHAR(64) NULL,
+                    ADD INDEX ix_resumes_user_content_hash (user_id, content_hash)
+                """))
+                print("Successfully added content_hash column")
+            else:
+                print("content_hash column already exists")
+
+            connection.commit()
+    except Exception as e:
+        print(f"Error during migration: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
 import os
 from pathlib import Path
 
@@ -15,21 +16,35 @@ if ENV_PATH.exists():
 DATABASE_URL = f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}"
 engine = create_engine(DATABASE_URL)
 
+ADD_COLUMNS_SQL = """
+    ALTER TABLE resumes
+    ADD COLUMN certifications JSON NULL,
+    ADD COLUMN work_history JSON NULL
+"""
+
 def run_migration():
     """Add new columns to the resumes table."""
     try:
         with engine.connect() as connection:
-            # Add certifications column
-            connection.execute(text("""
-                ALTER TABLE resumes 
-                ADD COLUMN certifications JSON NULL
-            """))
-            
-            # Add work_history column
-            connection.execute(text("""
-                ALTER TABLE resumes 
-                ADD COLUMN work_history JSON NULL
-            """))
+            result = connection.execute(text("""
+                SELECT COUNT(*)
+                FROM information_schema.columns
+                WHERE table_schema = :db_name
+                AND table_name = 'resumes'
+                AND column_name IN ('certifications', 'work_history')
+            """), {"db_name": os.getenv('DB_NAME')})
+            if result.scalar() > 0:
+                print("certifications/work_history columns already exist")
+                return
+
+            # Add both columns in one table change; INSTANT makes it metadata-only on
+            # MySQL 8.0.12+; older servers reject the clause (1064 syntax error or 1846
+            # not supported) and fall back to a regular ALTER
+            try:
+                connection.execute(text(ADD_COLUMNS_SQL + ", ALGORITHM=INSTANT"))
+            except (OperationalError, ProgrammingError):
+                connection.rollback()
+                connection.execute(text(ADD_COLUMNS_SQL))
             
             connection.commit()
             print("Migration completed successfully!")
@@ -0,0 +1,66 @@
+from sqlalchemy import create_engine, text
+import os
+from pathlib import Path
+
+# Get the app directory path
+APP_DIR = Path(__file__).resolve().parent.parent
+ENV_PATH = APP_DIR / '.env'
+
+# Load environment variables
+if ENV_PATH.exists():
+    from dotenv import load_dotenv
+    load_dotenv(ENV_PATH)
+
+# Database connection
+DATABASE_URL = f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}"
+engine = create_engine(DATABASE_URL)
+
+INDEXES = {
+    "ix_resumes_user_created": "CREATE INDEX ix_resumes_user_created ON resumes (user_id, created_at)",
+    "ix_resumes_name_summary_ft": "CREATE FULLTEXT INDEX ix_resumes_name_summary_ft ON resumes (name, summary)",
+}
+
+# Superseded by the (user_id, created_at) index, which serves user_id lookups as a prefix
+REDUNDANT_INDEXES = ["ix_resumes_user_id"]
+
+def run_migration():
+    """Add the per-user listing and full-text search indexes to the resumes table."""
+    try:
+        with engine.connect() as connection:
+            result = connection.execute(text("""
+                SELECT DISTINCT index_name
+                FROM information_schema.statistics
+                WHERE table_schema = :db_name
+                AND table_name = 'resumes'
+            """), {"db_name": os.getenv('DB_NAME')})
+            existing = {row[0] for row in result}
+
+            changed = False
+            for name, ddl in INDEXES.items():
+                if name in existing:
+                    print(f"{name} already exists")
+                    continue
+                print(f"Creating {name}...")
+                connection.execute(text(ddl))
+                changed = True
+
+            for name in REDUNDANT_INDEXES:
+                if name in existing:
+                    print(f"Dropping {name}...")
+                    connection.execute(text(f"DROP INDEX {name} ON resumes"))
+                    changed = True
+
+            # Refresh index statistics so the optimizer picks the new per-user index
+            # straight away instead of after InnoDB's next automatic sampling
+            if changed:
+                print("Analyzing resumes table...")
+                connection.execute(text("ANALYZE TABLE resumes"))
+
+            connection.commit()
+            print("Migration completed successfully!")
+    except Exception as e:
+        print(f"Error during migration: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
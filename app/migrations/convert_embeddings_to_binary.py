@@ -0,0 +1,61 @@
+from sqlalchemy import create_engine, text
+import json
+import os
+import numpy as np
+from pathlib import Path
+
+# Get the app directory path
+APP_DIR = Path(__file__).resolve().parent.parent
+ENV_PATH = APP_DIR / '.env'
+
+# Load environment variables
+if ENV_PATH.exists():
+    from dotenv import load_dotenv
+    load_dotenv(ENV_PATH)
+
+# Database connection
+DATABASE_URL = f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}"
+engine = create_engine(DATABASE_URL)
+
+def run_migration():
+    """Convert resumes.embedding from a JSON list to float16 bytes in a BLOB column."""
+    try:
+        with engine.connect() as connection:
+            result = connection.execute(text("""
+                SELECT DATA_TYPE
+                FROM information_schema.columns
+                WHERE table_schema = :db_name
+                AND table_name = 'resumes'
+                AND column_name = 'embedding'
+            """), {"db_name": os.getenv('DB_NAME')})
+            if result.scalar() != 'json':
+                print("embedding column is already binary")
+                return
+
+            # Read the JSON embeddings before the column type changes
+            rows = connection.execute(text("""
+                SELECT id, embedding FROM resumes WHERE embedding IS NOT NULL
+            """)).fetchall()
+
+            connection.execute(text("""
+                ALTER TABLE resumes
+                MODIFY COLUMN embedding BLOB NULL
+            """))
+
+            updates = [
+                {"id": resume_id, "embedding": np.asarray(json.loads(embedding), dtype="<f2").tobytes()}
+                for resume_id, embedding in rows
+            ]
+            if updates:
+                connection.execute(text("""
+                    UPDATE resumes SET embedding = :embedding WHERE id = :id
+                """), updates)
+
+            connection.commit()
+            print(f"Migration completed successfully! Converted {len(updates)} embeddings.")
+    except Exception as e:
+        print(f"Error during migration: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
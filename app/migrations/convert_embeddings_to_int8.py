@@ -0,0 +1,47 @@
+from sqlalchemy import create_engine, text
+import os
+import sys
+from pathlib import Path
+
+# Get the app directory path
+APP_DIR = Path(__file__).resolve().parent.parent
+ENV_PATH = APP_DIR / '.env'
+
+# Load environment variables
+if ENV_PATH.exists():
+    from dotenv import load_dotenv
+    load_dotenv(ENV_PATH)
+
+sys.path.append(str(APP_DIR.parent))
+from app.services.embedding_codec import EMBEDDING_DIM, LEGACY_EMBEDDING_DTYPE, encode_embedding, decode_embedding
+
+# Database connection
+DATABASE_URL = f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}"
+engine = create_engine(DATABASE_URL)
+
+def run_migration():
+    """Re-encode float16 embeddings as int8 with a per-vector scale."""
+    try:
+        with engine.begin() as connection:
+            legacy_length = EMBEDDING_DIM * LEGACY_EMBEDDING_DTYPE.itemsize
+            rows = connection.execute(text("""
+                SELECT id, embedding FROM resumes
+                WHERE embedding IS NOT NULL AND LENGTH(embedding) = :legacy_length
+            """), {"legacy_length": legacy_length}).fetchall()
+
+            updates = [
+                {"id": resume_id, "embedding": encode_embedding(decode_embedding(embedding))}
+                for resume_id, embedding in rows
+            ]
+            if updates:
+                connection.execute(text("""
+                    UPDATE resumes SET embedding = :embedding WHERE id = :id
+                """), updates)
+
+            print(f"Migration completed successfully! Converted {len(updates)} embeddings.")
+    except Exception as e:
+        print(f"Error during migration: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
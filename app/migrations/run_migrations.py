@@ -5,14 +5,32 @@ from pathlib import Path
 # Add the parent directory to the Python path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-# Import the migration
-from migrations.add_new_columns import run_migration
+# Import the migrations
+from migrations import (
+    add_content_hash,
+    add_new_columns,
+    add_resume_indexes,
+    convert_embeddings_to_binary,
+    convert_embeddings_to_int8,
+)
+
+# Dependency order: JSON embeddings must be converted to binary before they can
+# be re-encoded as int8, and the index changes run last on the final schema
+MIGRATIONS = [
+    add_new_columns,
+    add_content_hash,
+    convert_embeddings_to_binary,
+    convert_embeddings_to_int8,
+    add_resume_indexes,
+]
 
 def main():
     """Run all migrations."""
     try:
         print("Starting migrations...")
-        run_migration()
+        for migration in MIGRATIONS:
+            print(f"Running {migration.__name__}...")
+            migration.run_migration()
         print("All migrations completed successfully!")
     except Exception as e:
         print(f"Error running migrations: {str(e)}")
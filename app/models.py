@@ -1,12 +1,12 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
-from sqlalchemy import Column, Integer, String, JSON, DateTime, Text, ForeignKey
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Text, ForeignKey, LargeBinary, Index
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import declarative_base
 import os
+import orjson
 from datetime import datetime
 from pathlib import Path
-from jose import jwt
 from fastapi import Header, HTTPException
 
 # Get the app directory path
@@ -23,9 +23,15 @@ Base = declarative_base()
 
 class Resume(Base):
     __tablename__ = "resumes"
+    __table_args__ = (
+        # Per-user listings filter on user_id and page by created_at
+        Index("ix_resumes_user_created", "user_id", "created_at"),
+        Index("ix_resumes_name_summary_ft", "name", "summary", mysql_prefix="FULLTEXT"),
+        Index("ix_resumes_user_content_hash", "user_id", "content_hash"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(String(255), nullable=False, index=True)  # Clerk's user ID
+    user_id = Column(String(255), nullable=False)  # Clerk's user ID
     name = Column(String(255), nullable=False)
     skills = Column(JSON, nullable=True)
     experience = Column(String(255), nullable=True)
@@ -33,33 +39,49 @@ class Resume(Base):
     contact = Column(JSON, nullable=True)
     summary = Column(Text, nullable=True)
     s3_location = Column(String(255), nullable=True)
-    embedding = Column(JSON, nullable=True)
+    embedding = Column(LargeBinary, nullable=True)  # int8 + scale bytes, see services/embedding_codec.py
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     certifications = Column(JSON, nullable=True)
     work_history = Column(JSON, nullable=True)
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of the uploaded file
 
 # Create database engine and session
 DATABASE_URL = f"mysql+aiomysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}"
 
+def _json_serializer(value) -> str:
+    # MySQL rejects JSON values sent as binary strings, so hand the driver text
+    return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
 engine = create_async_engine(
     DATABASE_URL,
-    pool_size=5,
-    max_overflow=10,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+    pool_size=20,
+    max_overflow=20,
     pool_timeout=30,
     pool_recycle=1800,
-    echo=True
+    query_cache_size=1200,
+    echo=bool(int(os.getenv("SQL_ECHO", "0")))  # SQL logging is opt-in, off in production
 )
 
 async def init_db():
     async with engine.begin() as conn:
+        # create_all only adds missing tables; indexes on an existing resumes table are
+        # added by app/migrations/add_resume_indexes.py, not at worker startup
         await conn.run_sync(Base.metadata.create_all)
 
 # Create async session factory
-async_session = sessionmaker(
+async_session = async_sessionmaker(
     engine,
-    class_=AsyncSession,
     expire_on_commit=False,
-    autocommit=False,
+    autoflush=False
+)
+
+# Read-only sessions run in autocommit mode, skipping the BEGIN/COMMIT round trips
+read_only_engine = engine.execution_options(isolation_level="AUTOCOMMIT")
+async_session_ro = async_sessionmaker(
+    read_only_engine,
+    expire_on_commit=False,
     autoflush=False
 )
 
@@ -71,6 +93,14 @@ async def get_db():
         finally:
             await session.close()
 
+# Dependency to get a session for endpoints that only read
+async def get_db_ro():
+    async with async_session_ro() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
 # Authentication dependencies
 CLERK_JWT_PUBLIC_KEY = os.getenv("CLERK_JWT_PUBLIC_KEY")
 
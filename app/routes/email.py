@@ -44,7 +44,7 @@ async def send_email(request: EmailRequest, current_user: Dict = Depends(get_cur
             raise HTTPException(status_code=400, detail="User email not found in token")
         from_email = email_addresses[0]['email_address']
 
-        success = email_sender.send_email(
+        success = await email_sender.send_email(
             from_email=from_email,
             to_email=request.recipient_email,
             subject=email_content['subject'],
@@ -1,20 +1,52 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from app.services.resume_parser import ResumeParser
-from app.models import ResumeUploadResponse, Resume, get_db
-from app.services.database import store_resume, get_resume, get_all_resumes, search_resumes
-from app.services.aws import s3, S3_BUCKET
+from app.models import ResumeUploadResponse, Resume, get_db, get_db_ro
+from app.services.database import store_resume, get_resume, get_all_resumes, search_resumes, get_resume_by_content_hash
+from app.services.aws import s3, S3_BUCKET, S3_TRANSFER_CONFIG, NonClosingFile
 from app.auth.clerk import get_current_user
+import asyncio
+import hashlib
 import os
+from concurrent.futures import ThreadPoolExecutor
 import uuid
 from typing import Optional, List
 import time
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.services.search_engine import SearchEngine
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_codec import encode_embedding
 
 router = APIRouter()
 resume_parser = ResumeParser()
 search_engine = SearchEngine()  # Initialize the search engine
+embedding_batcher = EmbeddingBatcher(search_engine.model)
+
+# Bounded pool for PDF extraction and the LLM call, so concurrent uploads
+# overlap instead of blocking the event loop
+_PARSE_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+def _sha256_file(fileobj) -> str:
+    """Hash a file in 1 MB chunks and rewind it."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(1024 * 1024), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+def _to_upload_response(db_resume: Resume) -> ResumeUploadResponse:
+    """Convert a stored Resume to ResumeUploadResponse."""
+    return ResumeUploadResponse(
+        name=db_resume.name,
+        skills=db_resume.skills,
+        experience=db_resume.experience,
+        education=db_resume.education,
+        contact=db_resume.contact,
+        summary=db_resume.summary,
+        s3_location=db_resume.s3_location,
+        created_at=db_resume.created_at
+    )
 
 @router.post("/upload/", response_model=ResumeUploadResponse)
 async def upload_resume(
@@ -36,32 +68,38 @@ async def upload_resume(
         if not file.filename.lower().endswith(('.pdf', '.doc', '.docx')):
             raise HTTPException(status_code=400, detail="Only PDF and Word documents are allowed")
         
+        # Return the stored resume if this user already uploaded the same file
+        content_hash = await run_in_threadpool(_sha256_file, file.file)
+        existing_resume = await get_resume_by_content_hash(db, user_id, content_hash)
+        if existing_resume:
+            return _to_upload_response(existing_resume)
+        
         # Generate a unique filename for S3
         timestamp = int(time.time())
         file_extension = os.path.splitext(file.filename)[1]
         s3_key = f"resumes/{user_id}/{timestamp}_{uuid.uuid4()}{file_extension}"
         
-        # Read file content
-        file_content = await file.read()
-        
-        # Upload to S3
-        s3.put_object(
-            Bucket=S3_BUCKET,
-            Key=s3_key,
-            Body=file_content,
-            ContentType=file.content_type
+        # Stream the spooled upload to S3 without blocking the event loop; the
+        # wrapper stops upload_fileobj from closing the handle parsed below
+        await run_in_threadpool(
+            s3.upload_fileobj,
+            NonClosingFile(file.file),
+            S3_BUCKET,
+            s3_key,
+            ExtraArgs={"ContentType": file.content_type},
+            Config=S3_TRANSFER_CONFIG
         )
         
-        # Get the file from S3 for parsing
-        s3_response = s3.get_object(Bucket=S3_BUCKET, Key=s3_key)
-        file_content = s3_response['Body'].read()
-        
-        # Parse the resume
-        result = resume_parser.parse_resume_text(file_content)
+        # Parse the resume from the same file handle
+        file.file.seek(0)
+        loop = asyncio.get_running_loop()
+        resume_text = await loop.run_in_executor(_PARSE_POOL, resume_parser.extract_text, file.file)
+        result = await loop.run_in_executor(_PARSE_POOL, resume_parser.llm_structure, resume_text)
         
-        # Add user_id and S3 file location to result
+        # Add user_id, S3 file location and content hash to result
         result['user_id'] = user_id
         result['s3_location'] = f"s3://{S3_BUCKET}/{s3_key}"
+        result['content_hash'] = content_hash
         
         # Generate embedding for the resume
         text_parts = [
@@ -73,38 +111,26 @@ async def upload_resume(
         ]
         text_blob = ' '.join(filter(None, text_parts))
         
-        # Create embedding using the search engine
-        embedding = search_engine.model.encode(text_blob)
-        result['embedding'] = embedding.tolist()
+        # Create embedding, batched with other concurrent uploads
+        embedding = await embedding_batcher.encode(text_blob)
+        result['embedding'] = encode_embedding(embedding)
         
         # Store in database
         db_resume = await store_resume(db, result)
         
-        # Convert to ResumeUploadResponse
-        response = ResumeUploadResponse(
-            name=db_resume.name,
-            skills=db_resume.skills,
-            experience=db_resume.experience,
-            education=db_resume.education,
-            contact=db_resume.contact,
-            summary=db_resume.summary,
-            s3_location=db_resume.s3_location,
-            created_at=db_resume.created_at
-        )
-        
-        return response
+        return _to_upload_response(db_resume)
         
     except Exception as e:
         # If there's an error, try to clean up the S3 object
         try:
             if 's3_key' in locals():
-                s3.delete_object(Bucket=S3_BUCKET, Key=s3_key)
+                await run_in_threadpool(s3.delete_object, Bucket=S3_BUCKET, Key=s3_key)
         except:
             pass
         raise HTTPException(status_code=500, detail=f"Error processing resume: {str(e)}")
 
 @router.get("/resumes/{resume_id}", response_model=ResumeUploadResponse)
-async def get_resume_by_id(resume_id: int, db: AsyncSession = Depends(get_db)):
+async def get_resume_by_id(resume_id: int, db: AsyncSession = Depends(get_db_ro)):
     """Get a specific resume by ID."""
     resume = await get_resume(db, resume_id)
     if not resume:
@@ -112,11 +138,11 @@ async def get_resume_by_id(resume_id: int, db: AsyncSession = Depends(get_db)):
     return resume
 
 @router.get("/resumes/", response_model=List[ResumeUploadResponse])
-async def list_resumes(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
+async def list_resumes(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db_ro)):
     """List all resumes with pagination."""
     return await get_all_resumes(db, skip, limit)
 
 @router.get("/resumes/search/", response_model=List[ResumeUploadResponse])
-async def search_resumes_by_query(query: str, db: AsyncSession = Depends(get_db)):
+async def search_resumes_by_query(query: str, db: AsyncSession = Depends(get_db_ro)):
     """Search resumes by name, skills, or summary."""
     return await search_resumes(db, query) 
\ No newline at end of file
@@ -9,7 +9,7 @@ screening_generator = ScreeningGenerator()
 async def generate_questions(request: ScreeningRequest):
     """Generate screening questions for a specific skill and level."""
     try:
-        questions = screening_generator.generate_questions(
+        questions = await screening_generator.agenerate_questions(
             skill=request.skill,
             level=request.level
         )
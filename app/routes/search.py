@@ -1,28 +1,134 @@
 from fastapi import APIRouter, HTTPException, Depends
-from app.services.search_engine import SearchEngine
-from app.models import SearchQuery, SearchResponse, get_db
-from typing import List, Dict, Any
+from app.services.search_engine import SearchEngine, parse_json_column
+from app.models import SearchQuery, get_db, async_session_ro
+from typing import Dict, Any, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-import json
-import sqlite3
+import asyncio
+import re
+import time
+from functools import lru_cache
+import orjson
+from cachetools import TTLCache
 from app.services.screening_generator import ScreeningGenerator
 from app.services.email_generator import EmailGenerator
 from app.services.llm_utils import call_groq
+from app.services.smtp_pool import SMTPPool
 import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from email.message import EmailMessage
 from app.auth.clerk import get_current_user
 from fastapi import Request, Body
-import json
+from fastapi.responses import ORJSONResponse
 
 router = APIRouter()
 search_engine = SearchEngine()
 screening_generator = ScreeningGenerator()
 email_generator = EmailGenerator()
 
-@router.get("/all/", response_model=List[Dict[str, Any]])
+# verify_database repairs rows with missing embeddings; it only needs to run
+# occasionally, not on every search
+VERIFY_INTERVAL_SECONDS = 300
+_last_verified: Optional[float] = None
+
+# Streamed through a server-side cursor in batches of yield_per rows
+_SEL_USER_RESUMES = text("""
+    SELECT id, name, skills, experience, education, contact, summary 
+    FROM resumes
+    WHERE user_id = :user_id
+""").execution_options(yield_per=500)
+_DELETE_USER_RESUMES = text("DELETE FROM resumes WHERE user_id = :user_id")
+
+# Per-resume lookup shared by the single-resume endpoints. Rows are cached briefly
+# per (user_id, resume_id), so a client opening a resume and then requesting
+# screening questions or an email does not re-query the same row.
+_SEL_RESUME = text("""
+    SELECT id, name, skills, experience, education, contact, summary, created_at
+    FROM resumes
+    WHERE id = :resume_id AND user_id = :user_id
+""")
+_resume_cache: TTLCache = TTLCache(maxsize=4096, ttl=30)
+
+async def _load_resume(db: AsyncSession, user_id: str, resume_id: int) -> Optional[Dict[str, Any]]:
+    """Return the user's resume with skills/contact decoded, or None if it isn't theirs.
+
+    The dict is shared through the cache; callers must not modify it.
+    """
+    key = (user_id, resume_id)
+    resume = _resume_cache.get(key)
+    if resume is None:
+        result = await db.execute(_SEL_RESUME, {"resume_id": resume_id, "user_id": user_id})
+        row = result.fetchone()
+        if row is None:
+            return None
+        resume = _resume_cache[key] = {
+            "id": row[0],
+            "name": row[1],
+            "skills": parse_json_column(row[2], []),
+            "experience": row[3],
+            "education": row[4],
+            "contact": parse_json_column(row[5], {}),
+            "summary": row[6],
+            "created_at": row[7]
+        }
+    return resume
+
+def _invalidate_resume_cache(user_id: str, resume_id: Optional[int] = None):
+    """Drop one cached resume row, or all of a user's rows."""
+    if resume_id is not None:
+        _resume_cache.pop((user_id, resume_id), None)
+        return
+    for key in [key for key in _resume_cache.keys() if key[0] == user_id]:
+        _resume_cache.pop(key, None)
+
+# Words marking an education entry as a certification
+_CERT_RE = re.compile(r"\b(?:CPA|CA|CMA|Certified|Professional|Associate)\b")
+
+# Cheap prefilter: queries without these hints (e.g. "Find data scientists")
+# have nothing for the LLM to extract, so skip the round trip entirely.
+_EXP_HINT_RE = re.compile(r"\d|\b(?:years?|yrs?)\b", re.IGNORECASE)
+_LOC_HINT_RE = re.compile(r"\b(?:in|at|from|near|based|remote|relocat\w*)\b", re.IGNORECASE)
+
+def _extract_location_experience(query: str) -> Tuple[Optional[str], Optional[int]]:
+    """Extract location and years of experience from a search query using the LLM."""
+    if not (_EXP_HINT_RE.search(query) or _LOC_HINT_RE.search(query)):
+        return None, None
+    return _extract_location_experience_cached(" ".join(query.lower().split()))
+
+# Fixed prompt prefix; only the query is appended, so the provider can reuse its
+# cached prefill for every extraction call
+_EXTRACT_PROMPT_PREFIX = """Extract the location and years of experience from this job search query.
+Return ONLY a JSON object in this exact format:
+{"location": "city name or null", "experience_years": number or null}
+
+Examples:
+Query: "Python developers in Bangalore"
+{"location": "Bangalore", "experience_years": null}
+
+Query: "React developers with 5 years experience"
+{"location": null, "experience_years": 5}
+
+Query: "JavaScript developers in Mumbai with 3+ years"
+{"location": "Mumbai", "experience_years": 3}
+
+Query: "Find data scientists"
+{"location": null, "experience_years": null}
+
+Query: """
+
+@lru_cache(maxsize=1024)
+def _extract_location_experience_cached(query: str) -> Tuple[Optional[str], Optional[int]]:
+    prompt = f'{_EXTRACT_PROMPT_PREFIX}"{query}"\n'
+    response, usage = call_groq(prompt, temperature=0.0, max_tokens=100)
+    # Not tied to a user (results are shared across users), so log the usage here to
+    # show how much of the fixed prefix the provider serves from its cache
+    print(
+        f"Filter extraction tokens: input={usage['input_tokens']} "
+        f"cached={usage['cached_tokens']} output={usage['output_tokens']}"
+    )
+    parsed = orjson.loads(response.strip())
+    return parsed.get("location"), parsed.get("experience_years")
+
+@router.get("/all/")
 async def get_all_resumes(
     request: Request,
     db: AsyncSession = Depends(get_db)
@@ -31,31 +137,54 @@ async def get_all_resumes(
     try:
         # Get user_id from request state
         user_id = request.state.user_id
-        query = text("""
-            SELECT id, name, skills, experience, education, contact, summary 
-            FROM resumes
-            WHERE user_id = :user_id
-        """)
-        result = await db.execute(query, {"user_id": user_id})
-        rows = result.fetchall()
+        result = await db.stream(_SEL_USER_RESUMES, {"user_id": user_id})
         
-        results = []
-        for row in rows:
-            results.append({
+        # skills/contact are already JSON text; embed them as-is instead of
+        # parsing and re-serialising every row
+        return ORJSONResponse([
+            {
                 "id": row[0],
                 "name": row[1],
-                "skills": json.loads(row[2]) if row[2] else [],
+                "skills": orjson.Fragment(row[2]) if row[2] else [],
                 "experience": row[3],
                 "education": row[4],
-                "contact": json.loads(row[5]) if row[5] else {},
+                "contact": orjson.Fragment(row[5]) if row[5] else {},
                 "summary": row[6]
-            })
-
-        return results
+            }
+            async for row in result
+        ])
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving resumes: {str(e)}")
 
-@router.post("/search/", response_model=List[Dict[str, Any]])
+async def _resolve_search_filters(query: SearchQuery) -> Tuple[Optional[str], Optional[int]]:
+    """Use the explicit location/experience filters, filling gaps from the query text."""
+    location = query.location
+    experience_years = query.experience_years
+
+    if location is None or experience_years is None:
+        try:
+            parsed_location, parsed_experience = await asyncio.to_thread(
+                _extract_location_experience, query.query
+            )
+            if location is None:
+                location = parsed_location
+            if experience_years is None:
+                experience_years = parsed_experience
+        except Exception as e:
+            print(f"Error parsing query: {str(e)}")
+            # Continue with None values
+
+    return location, experience_years
+
+async def _rank_candidates(query: str, user_id: str):
+    """Semantic + keyword ranking of the user's resumes, off the event loop."""
+    try:
+        return await asyncio.to_thread(search_engine.rank_candidates, query, user_id)
+    except Exception as e:
+        print(f"Error in search: {str(e)}")
+        return []
+
+@router.post("/search/")
 async def search_candidates(
     query: SearchQuery,
     request: Request,
@@ -63,105 +192,60 @@ async def search_candidates(
 ):
     """Search candidates based on query parameters using semantic search."""
     try:
-        # Verify database state before searching
-        search_engine.verify_database()
+        # Verify database state before searching, at most once per interval; the slot
+        # is claimed before awaiting so concurrent requests don't all run the check
+        global _last_verified
+        now = time.monotonic()
+        if _last_verified is None or now - _last_verified >= VERIFY_INTERVAL_SECONDS:
+            previous, _last_verified = _last_verified, now
+            try:
+                await asyncio.to_thread(search_engine.verify_database)
+            except Exception:
+                _last_verified = previous
+                raise
 
         # Get user_id from request state
         user_id = request.state.user_id
 
-        # Parse location and experience_years from query if not provided
-        location = query.location
-        experience_years = query.experience_years
+        # Parse location/experience from the query while the semantic ranking runs;
+        # they only affect the re-ranking step
+        (location, experience_years), candidates = await asyncio.gather(
+            _resolve_search_filters(query),
+            _rank_candidates(query.query, user_id)
+        )
+        if not candidates:
+            return []
 
-        if location is None or experience_years is None:
-            try:
-                prompt = f"""
-                Extract the location and years of experience from this job search query.
-                Return ONLY a JSON object in this exact format:
-                {{"location": "city name or null", "experience_years": number or null}}
-
-                Examples:
-                Query: "Python developers in Bangalore"
-                {{"location": "Bangalore", "experience_years": null}}
-
-                Query: "React developers with 5 years experience"
-                {{"location": null, "experience_years": 5}}
-
-                Query: "JavaScript developers in Mumbai with 3+ years"
-                {{"location": "Mumbai", "experience_years": 3}}
-
-                Query: "Find data scientists"
-                {{"location": null, "experience_years": null}}
-
-                Query: "{query.query}"
-                """
-                response, _ = call_groq(prompt, temperature=0.0, max_tokens=100)
-                parsed = json.loads(response.strip())
-                if location is None:
-                    location = parsed.get("location")
-                if experience_years is None:
-                    experience_years = parsed.get("experience_years")
-            except Exception as e:
-                print(f"Error parsing query: {str(e)}")
-                # Continue with None values
-
-        # Use the search engine's semantic search with user_id filter
-        results = search_engine.search(
-            query=query.query,
+        matches = await asyncio.to_thread(
+            search_engine.rerank,
+            candidates,
             location=location,
-            experience_years=experience_years,
-            user_id=user_id
+            experience_years=experience_years
         )
-        
-        if not results or not results.get("matches"):
+        if not matches:
             return []
             
-        # Process and return the matches
-        processed_results = []
-        for match in results["matches"]:
-            try:
-                # Ensure skills and contact are properly parsed
-                skills = match["skills"]
-                if isinstance(skills, str):
-                    try:
-                        skills = json.loads(skills)
-                    except json.JSONDecodeError:
-                        skills = []
-                
-                contact = match["contact"]
-                if isinstance(contact, str):
-                    try:
-                        contact = json.loads(contact)
-                    except json.JSONDecodeError:
-                        contact = {}
-                
-                # Ensure similarity_score is a float within 0..1
-                sim = match.get("similarity_score", 0)
-                try:
-                    sim = float(sim)
-                except Exception:
-                    sim = 0.0
-                sim = max(0.0, min(sim, 1.0))
-
-                processed_results.append({
-                    "id": match["id"],
-                    "name": match["name"],
-                    "skills": skills,
-                    "experience": match["experience"],
-                    "education": match["education"],
-                    "contact": contact,
-                    "summary": match["summary"],
-                    "similarity_score": sim
-                })
-            except Exception as e:
-                print(f"Error processing match: {str(e)}")
-                continue
+        # Fields are already decoded when the user index is built, so the
+        # matches only need trimming to the response shape
+        processed_results = [
+            {
+                "id": match["id"],
+                "name": match["name"],
+                "skills": match["skills"],
+                "experience": match["experience"],
+                "education": match["education"],
+                "contact": match["contact"],
+                "summary": match["summary"],
+                "similarity_score": match.get("similarity_score", 0)
+            }
+            for match in matches
+        ]
         
-        return processed_results
+        return ORJSONResponse(processed_results)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching candidates: {str(e)}")
 
-@router.get("/resumes/{resume_id}", response_model=Dict[str, Any])
+@router.get("/resumes/{resume_id}")
 async def get_resume(
     resume_id: int,
     request: Request,
@@ -170,29 +254,20 @@ async def get_resume(
     """Get a specific resume by ID."""
     try:
         user_id = request.state.user_id
-        query = text("""
-            SELECT id, name, skills, experience, education, contact, summary 
-            FROM resumes 
-            WHERE id = :resume_id AND user_id = :user_id
-        """)
-        result = await db.execute(query, {
-            "resume_id": resume_id,
-            "user_id": user_id
-        })
-        resume = result.fetchone()
+        resume = await _load_resume(db, user_id, resume_id)
         
         if not resume:
             raise HTTPException(status_code=404, detail="Resume not found")
             
-        return {
-            "id": resume[0],
-            "name": resume[1],
-            "skills": json.loads(resume[2]) if resume[2] else [],
-            "experience": resume[3],
-            "education": resume[4],
-            "contact": json.loads(resume[5]) if resume[5] else {},
-            "summary": resume[6]
-        }
+        return ORJSONResponse({
+            "id": resume["id"],
+            "name": resume["name"],
+            "skills": resume["skills"],
+            "experience": resume["experience"],
+            "education": resume["education"],
+            "contact": resume["contact"],
+            "summary": resume["summary"]
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving resume: {str(e)}")
 
@@ -206,7 +281,8 @@ async def add_candidate(
     try:
         # Add user_id to the candidate data
         candidate["user_id"] = request.state.user_id
-        search_engine.add_candidate(candidate)
+        resume_id = await asyncio.to_thread(search_engine.add_candidate, candidate)
+        _invalidate_resume_cache(candidate["user_id"], resume_id)
         return {"message": "Candidate added successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error adding candidate: {str(e)}")
@@ -219,15 +295,20 @@ async def clear_index(
     """Clear the search index for the current user."""
     try:
         user_id = request.state.user_id
-        # Only clear resumes for the current user
-        query = text("DELETE FROM resumes WHERE user_id = :user_id")
-        await db.execute(query, {"user_id": user_id})
-        await db.commit()
-        return {"message": "Search index cleared successfully"}
+        # Only clear resumes for the current user; the cached search index goes
+        # with them in the same step
+        async with db.begin():
+            result = await db.execute(_DELETE_USER_RESUMES, {"user_id": user_id})
+            await asyncio.to_thread(search_engine.drop_user_index, user_id)
+        _invalidate_resume_cache(user_id)
+        return {
+            "message": "Search index cleared successfully",
+            "deleted": result.rowcount
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error clearing index: {str(e)}")
 
-@router.get("/resume/{resume_id}", response_model=Dict[str, Any])
+@router.get("/resume/{resume_id}")
 async def get_resume_details(
     resume_id: int,
     request: Request,
@@ -236,58 +317,32 @@ async def get_resume_details(
     """Get detailed information about a specific resume."""
     try:
         user_id = request.state.user_id
-        query = text("""
-            SELECT id, name, skills, experience, education, contact, summary, created_at
-            FROM resumes 
-            WHERE id = :resume_id AND user_id = :user_id
-        """)
-        result = await db.execute(query, {
-            "resume_id": resume_id,
-            "user_id": user_id
-        })
-        resume = result.fetchone()
+        resume = await _load_resume(db, user_id, resume_id)
         
         if not resume:
             raise HTTPException(status_code=404, detail="Resume not found")
             
-        # Parse the resume data
-        resume_data = {
-            "id": resume[0],
-            "name": resume[1],
-            "skills": json.loads(resume[2]) if resume[2] else [],
-            "experience": resume[3],
-            "education": resume[4],
-            "contact": json.loads(resume[5]) if resume[5] else {},
-            "summary": resume[6],
-            "created_at": resume[7]
-        }
+        resume_data = resume
         
         # Extract first name
         first_name = resume_data["name"].split()[0] if resume_data["name"] else ""
         
-        # Parse education details
+        # Parse education details and certifications in one pass
+        education_parts = [part.strip() for part in (resume_data["education"] or "").split(",") if part.strip()]
         education_details = []
-        if resume_data["education"]:
-            education_parts = [part.strip() for part in resume_data["education"].split(",")]
-            for part in education_parts:
-                if part:
-                    education_details.append({
-                        "degree": part,
-                        "year": None,
-                        "institution": None
-                    })
-        
-        # Extract certifications
         certifications = []
-        if resume_data["education"]:
-            cert_keywords = ["CPA", "CA", "CMA", "Certified", "Professional", "Associate"]
-            for part in education_parts:
-                if any(keyword in part for keyword in cert_keywords):
-                    certifications.append({
-                        "name": part,
-                        "issuing_organization": None,
-                        "year": None
-                    })
+        for part in education_parts:
+            education_details.append({
+                "degree": part,
+                "year": None,
+                "institution": None
+            })
+            if _CERT_RE.search(part):
+                certifications.append({
+                    "name": part,
+                    "issuing_organization": None,
+                    "year": None
+                })
         
         # Structure the response
         detailed_response = {
@@ -311,7 +366,7 @@ async def get_resume_details(
             "created_at": resume_data["created_at"]
         }
         
-        return detailed_response
+        return ORJSONResponse(detailed_response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving resume details: {str(e)}")
 
@@ -323,19 +378,13 @@ async def get_screening_questions(resume_id: int, request: Request, db: AsyncSes
         # For development/testing, use a default user_id if None
         if user_id is None:
             user_id = "test_user"
-        query = text("SELECT name, skills, experience FROM resumes WHERE id = :resume_id AND user_id = :user_id")
-        result = await db.execute(query, {"resume_id": resume_id, "user_id": user_id})
-        row = result.fetchone()
-        if not row:
+        resume = await _load_resume(db, user_id, resume_id)
+        if not resume:
             raise HTTPException(status_code=404, detail="Resume not found")
-        name, skills_json, experience = row
-        try:
-            skills = json.loads(skills_json) if skills_json else []
-        except (json.JSONDecodeError, TypeError):
-            skills = []
+        name, skills, experience = resume["name"], resume["skills"], resume["experience"]
         # Use the top skill or fallback
         skill = skills[0] if skills else "developer"
-        questions = screening_generator.generate_questions(skill=skill, level="senior" if experience and ("5" in experience or "senior" in experience.lower()) else "mid")
+        questions = await screening_generator.agenerate_questions(skill=skill, level="senior" if experience and ("5" in experience or "senior" in experience.lower()) else "mid")
         return {"questions": questions}
     except HTTPException:
         raise
@@ -348,16 +397,10 @@ async def generate_outreach_email(resume_id: int, request: Request, email_reques
     try:
         template = email_request.get("template", "initial_outreach")
         user_id = request.state.user_id
-        query = text("SELECT name, skills, experience FROM resumes WHERE id = :resume_id AND user_id = :user_id")
-        result = await db.execute(query, {"resume_id": resume_id, "user_id": user_id})
-        row = result.fetchone()
-        if not row:
+        resume = await _load_resume(db, user_id, resume_id)
+        if not resume:
             raise HTTPException(status_code=404, detail="Resume not found")
-        name, skills_json, experience = row
-        try:
-            skills = json.loads(skills_json) if skills_json else []
-        except (json.JSONDecodeError, TypeError):
-            skills = []
+        name, skills, experience = resume["name"], resume["skills"], resume["experience"]
         skill = skills[0] if skills else "developer"
         key_skills = ", ".join(skills) if skills else skill
         # You can expand template logic as needed
@@ -379,15 +422,17 @@ async def generate_outreach_email(resume_id: int, request: Request, email_reques
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating outreach email: {str(e)}")
 
+# Authenticated SMTP connections, reused across sends; created on first use
+# from the SMTP_* settings
+_smtp_pool: Optional[SMTPPool] = None
+
 @router.post("/resume/{resume_id}/send-email")
 async def send_email(resume_id: int, request: Request, payload: dict = Body(...), db: AsyncSession = Depends(get_db)):
     """Send an email to the candidate using SMTP config from .env."""
     try:
         user_id = request.state.user_id
         # Check if resume belongs to user
-        query = text("SELECT id FROM resumes WHERE id = :resume_id AND user_id = :user_id")
-        result = await db.execute(query, {"resume_id": resume_id, "user_id": user_id})
-        if not result.fetchone():
+        if not await _load_resume(db, user_id, resume_id):
             raise HTTPException(status_code=404, detail="Resume not found")
         
         to_email = payload.get("recipient")
@@ -403,106 +448,101 @@ async def send_email(resume_id: int, request: Request, payload: dict = Body(...)
         if not all([smtp_host, smtp_user, smtp_pass, sender_email]):
             print("Warning: SMTP configuration incomplete. Simulating email send for development.")
             return {"message": "Email simulated (SMTP config missing). Check logs for details."}
-        msg = MIMEMultipart()
+        msg = EmailMessage()
         msg["From"] = sender_email
         msg["To"] = to_email
         msg["Subject"] = subject
-        msg.attach(MIMEText(body, "plain"))
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_user, smtp_pass)
-            server.sendmail(sender_email, to_email, msg.as_string())
+        msg.set_content(body)
+        global _smtp_pool
+        if _smtp_pool is None:
+            _smtp_pool = SMTPPool(smtp_host, smtp_port, smtp_user, smtp_pass)
+        await _smtp_pool.send_message(msg)
         return {"message": "Email sent successfully."}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to send email: {str(e)}")
 
+# Dashboard aggregates. Experience is the leading number of the free-text
+# "experience" column (e.g. "5 years"); rows without one land in the NULL bucket.
+_DASHBOARD_EXPERIENCE_SQL = text("""
+    SELECT FLOOR(years) AS bucket, COUNT(*) AS cnt, SUM(years) AS total
+    FROM (
+        SELECT CASE
+            WHEN TRIM(experience) REGEXP '^[0-9]+([.][0-9]+)?( |$)'
+            THEN CAST(SUBSTRING_INDEX(TRIM(experience), ' ', 1) AS DECIMAL(10, 2))
+        END AS years
+        FROM resumes
+        WHERE user_id = :user_id
+    ) AS exp
+    GROUP BY bucket
+    ORDER BY bucket
+""")
+
+_DASHBOARD_SKILLS_SQL = text("""
+    SELECT s.skill, COUNT(*) AS cnt
+    FROM resumes r,
+         JSON_TABLE(r.skills, '$[*]' COLUMNS (skill VARCHAR(255) PATH '$')) AS s
+    WHERE r.user_id = :user_id AND s.skill IS NOT NULL
+    GROUP BY s.skill
+    ORDER BY cnt DESC
+""")
+
+_DASHBOARD_LOCATIONS_SQL = text("""
+    SELECT JSON_UNQUOTE(JSON_EXTRACT(contact, '$.location')) AS loc, COUNT(*) AS cnt
+    FROM resumes
+    WHERE user_id = :user_id
+      AND JSON_TYPE(JSON_EXTRACT(contact, '$.location')) = 'STRING'
+      AND JSON_UNQUOTE(JSON_EXTRACT(contact, '$.location')) <> ''
+    GROUP BY loc
+    ORDER BY cnt DESC
+""")
+
+async def _fetch_all(query, params: Dict[str, Any]):
+    """Run a read-only query on its own session so several can run concurrently."""
+    async with async_session_ro() as session:
+        result = await session.execute(query, params)
+        return result.fetchall()
+
 @router.get("/dashboard-metrics")
-async def dashboard_metrics(
-    request: Request,
-    db: AsyncSession = Depends(get_db)
-):
+async def dashboard_metrics(request: Request):
     """Return dashboard metrics for the current user."""
     try:
-        user_id = request.state.user_id
-        # Total candidates for the user
-        query = text("SELECT COUNT(*) FROM resumes WHERE user_id = :user_id")
-        result = await db.execute(query, {"user_id": user_id})
-        total_candidates = result.scalar() or 0
-
-        # Get all resumes for the user
-        query = text("""
-            SELECT experience, contact, skills 
-            FROM resumes 
-            WHERE user_id = :user_id
-        """)
-        result = await db.execute(query, {"user_id": user_id})
-        rows = result.fetchall()
-
-        # Process experience data
-        exp_years = []
-        locations = []
-        all_skills = []
-
-        for row in rows:
-            # Process experience
-            try:
-                if row[0]:
-                    val = float(row[0].split()[0])
-                    exp_years.append(val)
-            except Exception:
-                continue
+        params = {"user_id": request.state.user_id}
+        exp_rows, skill_rows, loc_rows = await asyncio.gather(
+            _fetch_all(_DASHBOARD_EXPERIENCE_SQL, params),
+            _fetch_all(_DASHBOARD_SKILLS_SQL, params),
+            _fetch_all(_DASHBOARD_LOCATIONS_SQL, params),
+        )
 
-            # Process location
-            try:
-                if row[1]:
-                    contact = json.loads(row[1])
-                    if contact.get("location"):
-                        locations.append(contact["location"])
-            except Exception:
-                continue
-
-            # Process skills
-            try:
-                if row[2]:
-                    skills = json.loads(row[2])
-                    all_skills.extend(skills)
-            except Exception:
-                continue
+        # Every resume falls in exactly one experience bucket
+        total_candidates = sum(row[1] for row in exp_rows)
+        exp_buckets = [row for row in exp_rows if row[0] is not None]
+        exp_count = sum(row[1] for row in exp_buckets)
+        exp_total = sum(float(row[2]) for row in exp_buckets)
 
         # Calculate metrics
-        avg_experience = round(sum(exp_years) / len(exp_years), 1) if exp_years else 0
-        top_location = max(set(locations), key=locations.count) if locations else ""
-        top_skill = max(set(all_skills), key=all_skills.count) if all_skills else ""
-
-        # Calculate distributions
-        from collections import Counter
+        avg_experience = round(exp_total / exp_count, 1) if exp_count else 0
+        top_location = loc_rows[0][0] if loc_rows else ""
+        top_skill = skill_rows[0][0] if skill_rows else ""
 
         # Skill distribution
-        skill_dist = []
-        if all_skills:
-            skill_counts = Counter(all_skills)
-            total = sum(skill_counts.values())
-            for skill, count in skill_counts.items():
-                skill_dist.append({"name": skill, "value": round(100 * count / total)})
+        skill_total = sum(row[1] for row in skill_rows)
+        skill_dist = [
+            {"name": skill, "value": round(100 * count / skill_total)}
+            for skill, count in skill_rows
+        ]
 
         # Experience distribution
-        exp_dist = []
-        if exp_years:
-            exp_bins = [str(int(y)) for y in exp_years]
-            exp_counts = Counter(exp_bins)
-            for years, count in exp_counts.items():
-                exp_dist.append({"name": f"{years} years", "value": count})
+        exp_dist = [
+            {"name": f"{int(bucket)} years", "value": count}
+            for bucket, count, _ in exp_buckets
+        ]
 
         # Location distribution
-        loc_dist = []
-        if locations:
-            loc_counts = Counter(locations)
-            for loc, count in loc_counts.items():
-                loc_dist.append({"name": loc, "value": count})
+        loc_dist = [{"name": loc, "value": count} for loc, count in loc_rows]
 
-        return {
+        return ORJSONResponse({
             "total_candidates": total_candidates,
             "average_experience": avg_experience,
             "top_location": top_location,
@@ -511,6 +551,6 @@ async def dashboard_metrics(
             "experience_distribution": exp_dist,
             "location_distribution": loc_dist,
             "skill_gaps": []  # You can implement skill gap analysis if needed
-        }
+        })
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calculating dashboard metrics: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error calculating dashboard metrics: {str(e)}")
@@ -1,5 +1,6 @@
 import os
 import boto3
+from boto3.s3.transfer import TransferConfig
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -26,4 +27,29 @@ if not S3_BUCKET:
 s3 = boto3.client(
     "s3",
     region_name=AWS_REGION
-) 
\ No newline at end of file
+) 
+
+# Multi-MB resumes are uploaded in parts; small ones go up in a single PUT
+S3_TRANSFER_CONFIG = TransferConfig(multipart_threshold=8 * 1024 * 1024)
+
+class NonClosingFile:
+    """Proxy for a file object whose close() does nothing.
+
+    upload_fileobj closes the file it is given once a single-PUT upload finishes;
+    wrap a file in this to keep reading it after the upload.
+    """
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+
+    def __getattr__(self, name):
+        return getattr(self._fileobj, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def close(self):
+        pass
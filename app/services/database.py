@@ -1,10 +1,21 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
+from sqlalchemy import select, text
 from app.models import Resume
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 import json
 
+# Statements are built once at import so SQLAlchemy's compiled cache is reused
+_SELECT_RESUME_BY_ID = text("SELECT * FROM resumes WHERE id = :id")
+_SELECT_RESUMES_PAGE = text("SELECT * FROM resumes LIMIT :limit OFFSET :skip")
+# name and summary go through the FULLTEXT index; skills is a JSON column and
+# cannot be full-text indexed, so it keeps the substring match
+_SEARCH_RESUMES = text("""
+    SELECT * FROM resumes 
+    WHERE MATCH(name, summary) AGAINST(:query IN NATURAL LANGUAGE MODE)
+    OR skills LIKE :like_query
+""")
+
 async def store_resume(db: AsyncSession, resume_data: dict) -> Resume:
     """Store a resume in the database."""
     try:
@@ -23,6 +34,7 @@ async def store_resume(db: AsyncSession, resume_data: dict) -> Resume:
             summary=resume_data.get('summary'),
             s3_location=resume_data.get('s3_location'),
             embedding=resume_data.get('embedding'),
+            content_hash=resume_data.get('content_hash'),
             created_at=datetime.utcnow(),
             certifications=resume_data.get('certifications', []),
             work_history=resume_data.get('work_history', [])
@@ -41,15 +53,24 @@ async def store_resume(db: AsyncSession, resume_data: dict) -> Resume:
 async def get_resume(db: AsyncSession, resume_id: int) -> Resume:
     """Get a resume by ID."""
     result = await db.execute(
-        text("SELECT * FROM resumes WHERE id = :id"),
+        _SELECT_RESUME_BY_ID,
         {"id": resume_id}
     )
     return result.fetchone()
 
+async def get_resume_by_content_hash(db: AsyncSession, user_id: str, content_hash: str) -> Optional[Resume]:
+    """Get the user's resume uploaded from a file with the given SHA-256 hash."""
+    result = await db.execute(
+        select(Resume)
+        .where(Resume.user_id == user_id, Resume.content_hash == content_hash)
+        .limit(1)
+    )
+    return result.scalars().first()
+
 async def get_all_resumes(db: AsyncSession, skip: int = 0, limit: int = 100) -> list:
     """Get all resumes with pagination."""
     result = await db.execute(
-        text("SELECT * FROM resumes LIMIT :limit OFFSET :skip"),
+        _SELECT_RESUMES_PAGE,
         {"limit": limit, "skip": skip}
     )
     return result.fetchall()
@@ -57,12 +78,7 @@ async def get_all_resumes(db: AsyncSession, skip: int = 0, limit: int = 100) ->
 async def search_resumes(db: AsyncSession, query: str) -> list:
     """Search resumes by query."""
     result = await db.execute(
-        text("""
-            SELECT * FROM resumes 
-            WHERE name LIKE :query 
-            OR summary LIKE :query 
-            OR skills LIKE :query
-        """),
-        {"query": f"%{query}%"}
+        _SEARCH_RESUMES,
+        {"query": query, "like_query": f"%{query}%"}
     )
     return result.fetchall() 
\ No newline at end of file
@@ -1,28 +1,30 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from email.message import EmailMessage
 import os
+from typing import Dict
+from .smtp_pool import SMTPPool
 
 class EmailSender:
-    def send_email(self, from_email: str, to_email: str, subject: str, body: str):
+    def __init__(self):
+        # One pool per sending account, since each logs in as its own address
+        self._pools: Dict[str, SMTPPool] = {}
+
+    async def send_email(self, from_email: str, to_email: str, subject: str, body: str):
         print(f"Attempting to send email from {from_email} to {to_email}")
-        msg = MIMEMultipart()
+        msg = EmailMessage()
         msg['From'] = from_email
         msg['To'] = to_email
         msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
+        msg.set_content(body)
 
         try:
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
             smtp_password = os.getenv('SMTP_PASSWORD')
             if not smtp_password:
                 print("SMTP_PASSWORD not set")
                 return False
-            server.login(from_email, smtp_password)  # Use app password
-            text = msg.as_string()
-            server.sendmail(from_email, to_email, text)
-            server.quit()
+            pool = self._pools.get(from_email)
+            if pool is None:
+                pool = self._pools[from_email] = SMTPPool('smtp.gmail.com', 587, from_email, smtp_password)  # Use app password
+            await pool.send_message(msg)
             print("Email sent successfully")
             return True
         except Exception as e:
@@ -0,0 +1,62 @@
+import asyncio
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent single-text encode calls into batched model.encode calls."""
+
+    def __init__(self, model: Any, max_batch_size: int = 8, max_wait: float = 0.01):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Encode one text, sharing a model call with other pending requests."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        """Wait for one request, then take whatever else arrives within max_wait."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = await asyncio.to_thread(
+                    self.model.encode,
+                    texts,
+                    batch_size=self.max_batch_size,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
@@ -0,0 +1,23 @@
+import numpy as np
+
+# Embeddings are stored as a little-endian float32 scale followed by int8 components
+# (388 bytes for 384 dims): component i is int8[i] * scale, with scale = max|v| / 127.
+# Rows written before that hold raw little-endian float16 (768 bytes) and still decode.
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2
+LEGACY_EMBEDDING_DTYPE = np.dtype("<f2")
+_SCALE_DTYPE = np.dtype("<f4")
+
+def encode_embedding(embedding) -> bytes:
+    """Serialize an embedding vector for the resumes.embedding column."""
+    vector = np.asarray(embedding, dtype=np.float32)
+    peak = float(np.max(np.abs(vector))) if vector.size else 0.0
+    scale = peak / 127.0 if peak > 0 else 1.0
+    quantized = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+    return np.asarray(scale, dtype=_SCALE_DTYPE).tobytes() + quantized.tobytes()
+
+def decode_embedding(data: bytes) -> np.ndarray:
+    """Load a stored embedding as a float32 vector."""
+    if len(data) == _SCALE_DTYPE.itemsize + EMBEDDING_DIM:
+        scale = np.frombuffer(data, dtype=_SCALE_DTYPE, count=1)[0]
+        return np.frombuffer(data, dtype=np.int8, offset=_SCALE_DTYPE.itemsize).astype(np.float32) * scale
+    return np.frombuffer(data, dtype=LEGACY_EMBEDDING_DTYPE).astype(np.float32)
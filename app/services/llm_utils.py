@@ -1,41 +1,83 @@
 import os
-from groq import Groq
+from groq import AsyncGroq, Groq
 from dotenv import load_dotenv
 
 load_dotenv()
 
+GROQ_MODEL = "llama-3.3-70b-versatile"
+
+# One client of each kind per process, so the underlying httpx connection pool (and
+# its TLS sessions) is reused across calls instead of being rebuilt per request
+_client = None
+_async_client = None
+
 def clean_json_response(response):
     # Placeholder: implement any cleaning needed
     return response
 
-def track_token_usage(user, model, input_tokens, output_tokens):
+def track_token_usage(user, model, input_tokens, output_tokens, cached_tokens=0):
     # Placeholder: implement tracking if needed
     pass
 
+def _api_key() -> str:
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError("GROQ_API_KEY not configured in environment")
+    return api_key
+
+def _get_client() -> Groq:
+    global _client
+    if _client is None:
+        _client = Groq(api_key=_api_key())
+    return _client
+
+def _get_async_client() -> AsyncGroq:
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncGroq(api_key=_api_key())
+    return _async_client
+
+def _handle_response(response, user):
+    """Extract the message text and token usage from a chat completion."""
+    cleaned_response = clean_json_response(response.choices[0].message.content.strip())
+    # Prompt tokens served from the provider's prefix cache, when reported
+    prompt_details = getattr(response.usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(prompt_details, "cached_tokens", None) or 0
+    if user:
+        track_token_usage(
+            user=user,
+            model=GROQ_MODEL,    
+            input_tokens=response.usage.prompt_tokens,
+            output_tokens=response.usage.completion_tokens,
+            cached_tokens=cached_tokens
+        )
+    return cleaned_response, {
+        'input_tokens': response.usage.prompt_tokens,
+        'output_tokens': response.usage.completion_tokens,
+        'cached_tokens': cached_tokens
+    }
+
 def call_groq(prompt: str, user=None, temperature: float = 0.7, max_tokens: int = 1000):
     try:
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError("GROQ_API_KEY not configured in environment")
+        response = _get_client().chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=GROQ_MODEL,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        return _handle_response(response, user)
+    except Exception as e:
+        raise Exception(f"Error calling GROQ API: {str(e)}")
 
-        client = Groq(api_key=api_key)
-        response = client.chat.completions.create(
+async def acall_groq(prompt: str, user=None, temperature: float = 0.7, max_tokens: int = 1000):
+    """Async call_groq, for request handlers that should not block the event loop."""
+    try:
+        response = await _get_async_client().chat.completions.create(
             messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
+            model=GROQ_MODEL,
             temperature=temperature,
             max_tokens=max_tokens
         )
-        cleaned_response = clean_json_response(response.choices[0].message.content.strip())
-        if user:
-            track_token_usage(
-                user=user,
-                model="llama-3.3-70b-versatile",    
-                input_tokens=response.usage.prompt_tokens,
-                output_tokens=response.usage.completion_tokens
-            )
-        return cleaned_response, {
-            'input_tokens': response.usage.prompt_tokens,
-            'output_tokens': response.usage.completion_tokens
-        }
+        return _handle_response(response, user)
     except Exception as e:
-        raise Exception(f"Error calling GROQ API: {str(e)}") 
\ No newline at end of file
+        raise Exception(f"Error calling GROQ API: {str(e)}")
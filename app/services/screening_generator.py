@@ -1,26 +1,57 @@
-from app.services.llm_utils import call_groq
+from app.services.llm_utils import acall_groq, call_groq
+from cachetools import LRUCache
 from typing import List
 
+# Questions depend only on (skill, level), so each pair is asked of the LLM once
+# per process; fallback questions are never cached
+_questions_cache = LRUCache(maxsize=1024)
+
+def _questions_prompt(skill: str, level: str) -> str:
+    return f"""Generate 5 technical interview questions for a {level} {skill} developer.\nThe questions should be:\n1. Technical and specific to {skill}\n2. Appropriate for {level} level\n3. Include both theoretical and practical aspects\n4. Focus on real-world scenarios\n5. Include one system design question if applicable\n\nFormat the response as a numbered list of questions."""
+
+def _parse_questions(response: str) -> List[str]:
+    questions = [q.strip() for q in response.split('\n') if q.strip()]
+    cleaned_questions = []
+    for q in questions:
+        q = q.lstrip('0123456789.- ')
+        if q:
+            cleaned_questions.append(q)
+    return cleaned_questions[:5]
+
+def _fallback_questions(skill: str) -> List[str]:
+    return [
+        f"What is your experience with {skill}?",
+        f"How would you approach a complex {skill} problem?",
+        f"What are the best practices in {skill}?",
+        f"How do you handle debugging in {skill}?",
+        f"What's your favorite {skill} feature and why?"
+    ]
+
 class ScreeningGenerator:
     def generate_questions(self, skill: str, level: str = "senior") -> List[str]:
         """Generate screening questions for a specific skill and level."""
-        prompt = f"""Generate 5 technical interview questions for a {level} {skill} developer.\nThe questions should be:\n1. Technical and specific to {skill}\n2. Appropriate for {level} level\n3. Include both theoretical and practical aspects\n4. Focus on real-world scenarios\n5. Include one system design question if applicable\n\nFormat the response as a numbered list of questions."""
+        cached = _questions_cache.get((skill, level))
+        if cached is not None:
+            return list(cached)
+        try:
+            response, _ = call_groq(_questions_prompt(skill, level), temperature=0.7, max_tokens=500)
+            questions = _parse_questions(response)
+            _questions_cache[(skill, level)] = tuple(questions)
+            return questions
+        except Exception as e:
+            print(f"Error generating questions with AI: {str(e)}. Using fallback questions.")
+            return _fallback_questions(skill)
 
+    async def agenerate_questions(self, skill: str, level: str = "senior") -> List[str]:
+        """Async generate_questions; several skills can be awaited together with asyncio.gather."""
+        cached = _questions_cache.get((skill, level))
+        if cached is not None:
+            return list(cached)
         try:
-            response, _ = call_groq(prompt, temperature=0.7, max_tokens=500)
-            questions = [q.strip() for q in response.split('\n') if q.strip()]
-            cleaned_questions = []
-            for q in questions:
-                q = q.lstrip('0123456789.- ')
-                if q:
-                    cleaned_questions.append(q)
-            return cleaned_questions[:5]
+            response, _ = await acall_groq(_questions_prompt(skill, level), temperature=0.7, max_tokens=500)
+            questions = _parse_questions(response)
+            _questions_cache[(skill, level)] = tuple(questions)
+            return questions
         except Exception as e:
             print(f"Error generating questions with AI: {str(e)}. Using fallback questions.")
-            return [
-                f"What is your experience with {skill}?",
-                f"How would you approach a complex {skill} problem?",
-                f"What are the best practices in {skill}?",
-                f"How do you handle debugging in {skill}?",
-                f"What's your favorite {skill} feature and why?"
-            ]
+            return _fallback_questions(skill)
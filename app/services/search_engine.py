@@ -1,24 +1,245 @@
 import numpy as np
 import faiss
+import ahocorasick
+import torch
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import os
 import json
+import orjson
+import time
+import hashlib
+import logging
+import tempfile
+import threading
 from sqlalchemy import create_engine, text
-from sqlalchemy.ext.asyncio import AsyncSession
-from .llm_utils import call_groq
+from cachetools import LRUCache
+from .embedding_codec import encode_embedding, decode_embedding
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
+# Rebuild a user's in-memory index at least this often, so in-place updates made by
+# other processes are picked up even when the row count and max id are unchanged
+INDEX_TTL_SECONDS = 60
+
+# Users with at least this many resumes are searched through an HNSW index; below it
+# the exact matrix-vector product is faster. The HNSW graph stores int8 scalar-quantized
+# vectors (a quarter of float32); the ANN_CANDIDATES rows it returns are re-scored
+# exactly against the float32 matrix before re-ranking.
+ANN_MIN_ROWS = 1000
+ANN_CANDIDATES = 100
+HNSW_M = 32
+HNSW_EF_SEARCH = 128
+FAISS_INDEX_DIR = Path(os.getenv(
+    "FAISS_INDEX_DIR",
+    Path(__file__).resolve().parent.parent.parent / "data" / "faiss_index"
+))
+
+# Each user's normalised float32 matrix and its ids are also saved in FAISS_INDEX_DIR
+# as .npy files named after a digest of every (id, CRC32(embedding)) pair. Later builds,
+# in any worker, memory-map them read-only instead of fetching and decoding every
+# embedding again, so workers share one copy through the page cache. Any insert,
+# delete or embedding update changes the digest, so a stale file is never loaded.
+
+# Embedding model runtime: "onnx" (ONNX Runtime) or "torch". EMBEDDING_ONNX_FILE picks
+# one of the exported graphs shipped with the model, e.g. the dynamic int8
+# "onnx/model_qint8_avx512_vnni.onnx"; the default is the fp32 graph with O3 fusions,
+# which produces the same vectors as the torch model.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "onnx")
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_O3.onnx")
+
+# Normalised embeddings of location strings, shared across searches since the same
+# cities recur across resumes and queries
+LOCATION_EMBEDDING_CACHE_SIZE = 4096
+
+# Rows fetched per round trip when streaming resumes into an index
+STREAM_BATCH_SIZE = 512
+
+# Batch size for re-encoding resumes whose embedding is missing
+VERIFY_ENCODE_BATCH_SIZE = 32
+
+# Per-index cache of keyword -> row mask; bounded since queries are user-controlled
+KEYWORD_MASK_CACHE_SIZE = 1024
+
+# Statements, built once at import
+_INDEX_SIGNATURE_SQL = text("""
+    SELECT COUNT(*), COALESCE(MAX(id), 0) FROM resumes
+    WHERE embedding IS NOT NULL AND user_id = :user_id
+""")
+# Index rows with a checksum of each embedding instead of the embedding itself; the
+# checksums version the persisted matrix
+_INDEX_ROWS_SQL = text("""
+    SELECT id, name, skills, experience, education, contact, summary, CRC32(embedding)
+    FROM resumes
+    WHERE embedding IS NOT NULL
+    AND user_id = :user_id
+    ORDER BY id
+""")
+_INDEX_EMBEDDINGS_SQL = text("""
+    SELECT id, embedding
+    FROM resumes
+    WHERE embedding IS NOT NULL
+    AND user_id = :user_id
+    ORDER BY id
+""")
+
+# LAST_INSERT_ID(id) hands the updated row's id back in the OK packet, like an insert
+_UPDATE_RESUME_SQL = text("""
+    UPDATE resumes 
+    SET skills = :skills, experience = :experience, education = :education, 
+        contact = :contact, summary = :summary, embedding = :embedding,
+        id = LAST_INSERT_ID(id)
+    WHERE name = :name AND user_id = :user_id
+""")
+_INSERT_RESUME_SQL = text("""
+    INSERT INTO resumes (
+        user_id, name, skills, experience, education, contact, summary, embedding
+    ) VALUES (
+        :user_id, :name, :skills, :experience, :education, :contact, :summary, :embedding
+    )
+""")
+_MISSING_EMBEDDINGS_SQL = text("""
+    SELECT id, name, skills, experience, education, contact, summary 
+    FROM resumes 
+    WHERE embedding IS NULL OR embedding = ''
+""")
+_UPDATE_EMBEDDING_SQL = text("""
+    UPDATE resumes 
+    SET embedding = :embedding 
+    WHERE id = :id
+""")
+
+# One embedding model per process, shared by every SearchEngine instance
+_MODEL = None
+_MODEL_LOCK = threading.Lock()
+
+def _get_model() -> SentenceTransformer:
+    """Load the embedding model on first use and return the shared instance."""
+    global _MODEL
+    if _MODEL is None:
+        with _MODEL_LOCK:
+            if _MODEL is None:
+                torch.set_num_threads(os.cpu_count() or 1)
+                if EMBEDDING_BACKEND == "onnx":
+                    model = SentenceTransformer(
+                        "all-MiniLM-L6-v2",
+                        backend="onnx",
+                        model_kwargs={"file_name": EMBEDDING_ONNX_FILE}
+                    )
+                else:
+                    model = SentenceTransformer("all-MiniLM-L6-v2")
+                model.eval()
+                _MODEL = model
+    return _MODEL
+
+def _ann_user_key(user_id: str) -> str:
+    """File-name prefix for a user's persisted HNSW indexes."""
+    return hashlib.sha1(user_id.encode()).hexdigest()[:16]
+
+def parse_json_column(value, default):
+    """Decode a JSON column returned as text, falling back to default."""
+    if value is None:
+        return default
+    if isinstance(value, (str, bytes)):
+        try:
+            return orjson.loads(value)
+        except ValueError:
+            return default
+    return value
+
+def _contact_location(contact) -> str:
+    """The location field of a resume's contact column."""
+    contact_dict = parse_json_column(contact, {}) if isinstance(contact, (str, bytes)) else (contact or {})
+    location = contact_dict.get('location', '') if isinstance(contact_dict, dict) else ''
+    return location if isinstance(location, str) else ''
+
+class UserIndex:
+    """In-memory embedding matrix and ranking metadata for one user's resumes."""
+    def __init__(self, ids: np.ndarray, matrix: np.ndarray, rows: List[tuple], postings: Dict[str, np.ndarray],
+                 signature: tuple, ann=None):
+        self.ids = ids  # int64 [N]
+        self.matrix = matrix  # float32 [N, D], rows L2-normalised
+        self.rows = rows  # id..summary columns (JSON parsed), aligned with ids
+        # lowercased education/skills/summary term -> positions of the rows containing it
+        self.postings = postings
+        self.signature = signature  # (row count, max id) the index was built from
+        self.ann = ann  # faiss HNSW (int8 SQ) index over matrix, or None for exact search
+        self.built_at = time.monotonic()
+        self._keyword_masks: Dict[str, np.ndarray] = {}
+
+    def keyword_masks(self, keywords: List[str]) -> List[np.ndarray]:
+        """Boolean masks, aligned with keywords, of the rows whose education, skills or
+        summary contain each keyword."""
+        masks: Dict[str, np.ndarray] = {}
+        missing = {keyword for keyword in keywords if keyword not in self._keyword_masks}
+        if missing:
+            # Keywords never contain whitespace, so a row's text contains a keyword
+            # exactly when one of its terms does. One Aho-Corasick pass over the distinct
+            # terms finds every missing keyword at once, instead of one scan per keyword.
+            automaton = ahocorasick.Automaton()
+            for keyword in missing:
+                automaton.add_word(keyword, keyword)
+            automaton.make_automaton()
+            masks.update((keyword, np.zeros(len(self.rows), dtype=bool)) for keyword in missing)
+            for term, positions in self.postings.items():
+                for keyword in {keyword for _, keyword in automaton.iter(term)}:
+                    masks[keyword][positions] = True
+            for keyword, mask in masks.items():
+                if len(self._keyword_masks) < KEYWORD_MASK_CACHE_SIZE:
+                    self._keyword_masks[keyword] = mask
+        return [self._keyword_masks.get(keyword, masks.get(keyword)) for keyword in keywords]
+
+    def score(self, query_embedding: np.ndarray, keywords: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (positions, similarity) for the rows worth re-ranking.
+
+        Similarity is the cosine similarity plus 0.1 per matching query keyword, or 0
+        for rows matching no keyword; those rows are never scored against the embedding.
+        """
+        if self.ann is None:
+            positions = np.arange(len(self.rows))
+            counts = np.zeros(len(self.rows), dtype=np.int32)
+            for mask in self.keyword_masks(keywords):
+                counts += mask
+        else:
+            k = min(ANN_CANDIDATES, len(self.rows))
+            _, positions = self.ann.search(query_embedding.reshape(1, -1).astype(np.float32), k)
+            positions = positions[0][positions[0] >= 0]
+            counts = np.zeros(len(positions), dtype=np.int32)
+            for mask in self.keyword_masks(keywords):
+                counts += mask[positions]
+
+        scores = np.zeros(len(positions), dtype=np.float64)
+        matched = counts > 0
+        scores[matched] = self.matrix[positions[matched]] @ query_embedding + 0.1 * counts[matched]
+        return positions, scores
+
 class SearchEngine:
     def __init__(self):
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
+        self.model = _get_model()
         # Get database connection details from environment
         self.db_user = os.getenv('DB_USER')
         self.db_password = os.getenv('DB_PASSWORD')
         self.db_host = os.getenv('DB_HOST')
         self.db_name = os.getenv('DB_NAME')
         self.database_url = f"mysql+pymysql://{self.db_user}:{self.db_password}@{self.db_host}/{self.db_name}"
-        self.engine = create_engine(self.database_url)
+        # Pooled connections are reused across calls; pre-ping replaces ones MySQL has
+        # closed after wait_timeout
+        self.engine = create_engine(
+            self.database_url,
+            pool_size=10,
+            max_overflow=20,
+            pool_recycle=1800,
+            pool_pre_ping=True,
+            query_cache_size=1200
+        )
+        self._user_indexes: Dict[str, UserIndex] = {}
+        self._location_embeddings = LRUCache(maxsize=LOCATION_EMBEDDING_CACHE_SIZE)
+        self._location_embeddings_lock = threading.Lock()
+
+    def warmup(self):
+        """Run one encode so lazy torch/MKL initialisation happens off the request path."""
+        self.model.encode(["warmup"])
 
     def store_resume(self, resume_data: Dict[str, Any]) -> int:
         """Store a resume in the database with user_id."""
@@ -34,490 +255,398 @@ class SearchEngine:
                 Education: {resume_data.get('education', '')}
                 """
             
-            embedding = self.model.encode(embedding_text)
-            embedding_list = embedding.tolist()
-            
-            if not isinstance(embedding_list, list):
-                raise ValueError("Invalid embedding format")
+            # Stored as a unit vector, like the upload and repair paths, so cosine
+            # similarity is a plain dot product
+            embedding = self.model.encode(embedding_text, normalize_embeddings=True)
 
-            with self.engine.connect() as conn:
-                # First, check if resume already exists for this user
-                result = conn.execute(text("""
-                    SELECT id FROM resumes 
-                    WHERE name = :name AND user_id = :user_id
-                """), {
-                    "name": resume_data["name"],
-                    "user_id": resume_data["user_id"]
-                })
-                existing = result.fetchone()
-                
-                if existing:
-                    # Update existing resume
-                    conn.execute(text("""
-                        UPDATE resumes 
-                        SET skills = :skills, experience = :experience, education = :education, 
-                            contact = :contact, summary = :summary, embedding = :embedding
-                        WHERE name = :name AND user_id = :user_id
-                    """), {
-                        "skills": json.dumps(resume_data["skills"]),
-                        "experience": resume_data["experience"],
-                        "education": resume_data.get("education"),
-                        "contact": json.dumps(resume_data.get("contact", {})),
-                        "summary": resume_data.get("summary"),
-                        "embedding": json.dumps(embedding_list),
-                        "name": resume_data["name"],
-                        "user_id": resume_data["user_id"]
-                    })
-                    resume_id = existing[0]
-                else:
-                    # Insert new resume
-                    conn.execute(text("""
-                        INSERT INTO resumes (
-                            user_id, name, skills, experience, education, contact, summary, embedding
-                        ) VALUES (
-                            :user_id, :name, :skills, :experience, :education, :contact, :summary, :embedding
-                        )
-                    """), {
-                        "user_id": resume_data["user_id"],
-                        "name": resume_data["name"],
-                        "skills": json.dumps(resume_data["skills"]),
-                        "experience": resume_data["experience"],
-                        "education": resume_data.get("education"),
-                        "contact": json.dumps(resume_data.get("contact", {})),
-                        "summary": resume_data.get("summary"),
-                        "embedding": json.dumps(embedding_list)
-                    })
-                    resume_id = conn.execute(text("SELECT LAST_INSERT_ID()")).fetchone()[0]
-                
-                # Verify the embedding was stored correctly
-                result = conn.execute(text("""
-                    SELECT embedding FROM resumes WHERE id = :id
-                """), {"id": resume_id})
-                stored_embedding = result.fetchone()
-                if not stored_embedding or not stored_embedding[0]:
-                    raise ValueError("Failed to store embedding")
-                
-                return resume_id
+            params = {
+                "user_id": resume_data["user_id"],
+                "name": resume_data["name"],
+                "skills": orjson.dumps(resume_data["skills"]).decode(),
+                "experience": resume_data["experience"],
+                "education": resume_data.get("education"),
+                "contact": orjson.dumps(resume_data.get("contact", {})).decode(),
+                "summary": resume_data.get("summary"),
+                "embedding": encode_embedding(embedding)
+            }
+            with self.engine.begin() as conn:
+                # Update the user's resume with this name if there is one (rowcount counts
+                # matched rows), otherwise insert it; either way lastrowid is its id
+                result = conn.execute(_UPDATE_RESUME_SQL, params)
+                if result.rowcount == 0:
+                    result = conn.execute(_INSERT_RESUME_SQL, params)
+                resume_id = result.lastrowid
+            
+            # Invalidate after the commit so a concurrent rebuild cannot cache the old rows
+            self.invalidate_user_index(resume_data["user_id"])
+            return resume_id
         except Exception as e:
-            print(f"Error storing resume: {str(e)}")
+            logger.error("Error storing resume: %s", e)
             raise
 
-    def semantic_search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        """Perform semantic search on resumes."""
-        try:
-            print(f"Starting semantic search for query: {query}")
-            # Create a more comprehensive query embedding
-            query_embedding = self.model.encode(query)
-            with self.engine.connect() as conn:
-                # Get all resumes with valid embeddings
-                result = conn.execute(text("""
-                    SELECT id, name, skills, experience, education, contact, summary, embedding 
-                    FROM resumes 
-                    WHERE embedding IS NOT NULL
-                """))
-                rows = result.fetchall()
-                print(f"Found {len(rows)} resumes with valid embeddings")
-
-                if not rows:
-                    print("No resumes found with valid embeddings")
-                    return []
-
-                similarities = []
-                for row in rows:
+    def add_candidate(self, candidate: Dict[str, Any]) -> int:
+        """Add a candidate to the search index; candidates are stored as resumes."""
+        return self.store_resume(candidate)
+
+    def rank_candidates(self, query: str, user_id: str) -> List[Tuple[float, tuple]]:
+        """Score the user's resumes against the query, before location/experience adjustments.
+
+        Returns (similarity, row) pairs; empty if the user has no resumes.
+        """
+        logger.debug("Starting search for query: %s", query)
+        if not user_id:
+            raise ValueError("user_id is required for search")
+        
+        # Create query embedding
+        query_embedding = self.model.encode(query, normalize_embeddings=True)
+        
+        with self.engine.connect() as conn:
+            index = self._get_user_index(conn, user_id)
+        logger.debug("Found %d resumes for user %s", len(index.rows), user_id)
+        
+        if not index.rows:
+            logger.debug("No resumes found for user")
+            return []
+        
+        # Keyword filter first, then one matrix-vector product over the matching rows
+        # (or the HNSW candidates for large databases)
+        positions, scores = index.score(query_embedding, query.lower().split())
+        return [(score, index.rows[position]) for position, score in zip(positions.tolist(), scores.tolist())]
+
+    def rerank(self, candidates: List[Tuple[float, tuple]], location: str = None, experience_years: int = None, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Apply location/experience adjustments to ranked candidates and return the top matches."""
+        location_embeddings = self._encode_locations(
+            [location] + [_contact_location(row[5]) for _, row in candidates]
+        ) if location else {}
+        query_location_embedding = location_embeddings.get(location)
+
+        kept_scores, kept_rows = [], []
+        for similarity, row in candidates:
+            try:
+                resume_id, contact, experience = row[0], row[5], row[3]
+
+                # Location-based similarity calculation (no skipping, include all)
+                location_similarity = 1.0  # Default if no location filter
+                if location:
                     try:
-                        resume_id, name, skills, experience, education, contact, summary, emb_json = row
-                        if not emb_json:  # Skip if embedding is NULL
-                            print(f"Skipping resume {resume_id} due to NULL embedding")
-                            continue
-                            
-                        resume_embedding = np.array(json.loads(emb_json))
-                        
-                        # Calculate cosine similarity
-                        similarity = np.dot(query_embedding, resume_embedding) / (
-                            np.linalg.norm(query_embedding) * np.linalg.norm(resume_embedding)
-                        )
-                        
-                        # Add a small boost for exact matches in skills or summary
-                        if isinstance(skills, str):
-                            skills_list = json.loads(skills)
+                        resume_location = _contact_location(contact)
+                        if resume_location:
+                            # Both embeddings are normalised, so the dot product is the cosine
+                            location_similarity = float(
+                                query_location_embedding @ location_embeddings[resume_location]
+                            )
+                            logger.debug("Resume %s location similarity: %.4f", resume_id, location_similarity)
                         else:
-                            skills_list = skills
-                            
-                        # Check for keyword matches
-                        query_keywords = query.lower().split()
-                        skills_text = ' '.join(skills_list).lower()
-                        summary_text = summary.lower() if summary else ""
-                        
-                        # Print matching information
-                        print(f"\nResume {resume_id} ({name}):")
-                        print(f"Skills: {skills_text}")
-                        print(f"Summary: {summary_text}")
-                        print(f"Query keywords: {query_keywords}")
-                        
-                        if any(keyword in skills_text for keyword in query_keywords):
-                            print(f"Found keyword match in skills for resume {resume_id}")
-                            similarity += 0.1
-                            
-                        if summary and any(keyword in summary_text for keyword in query_keywords):
-                            print(f"Found keyword match in summary for resume {resume_id}")
-                            similarity += 0.1
-                        
-                        print(f"Final similarity score: {similarity}")
-                        # Clamp similarity to valid range (cosine can be -1..1, but we boost/scale it)
-                        try:
-                            similarity = float(similarity)
-                        except Exception:
-                            similarity = 0.0
-                        # Ensure similarity is within 0.0 - 1.0 before storing
-                        similarity = max(0.0, min(similarity, 1.0))
-                        similarities.append((similarity, resume_id))
+                            # No location in resume, reduce similarity
+                            location_similarity = 0.3
+                            logger.debug("Resume %s has no location, using similarity: %s", resume_id, location_similarity)
                     except (json.JSONDecodeError, TypeError) as e:
-                        print(f"Error processing resume {resume_id}: {str(e)}")
-                        continue
-
-                if not similarities:
-                    print("No similarities calculated")
-                    return []
-
-                # Get top matches
-                top_matches = sorted(similarities, reverse=True)[:top_k]
-                print(f"\nTop matches: {top_matches}")
-                matched_ids = [match[1] for match in top_matches]
-
-                # Fetch full resume data for matches
-                placeholders = ",".join(["?"] * len(matched_ids))
-                result = conn.execute(text(f"""
-                    SELECT id, name, skills, experience, education, contact, summary 
-                    FROM resumes 
-                    WHERE id IN ({placeholders})
-                """), matched_ids)
-                
-                results = []
-                for row in result.fetchall():
-                    try:
-                        # Find the similarity score for this resume
-                        similarity_score = next((score for score, rid in top_matches if rid == row[0]), 0)
-                        # Safety clamp: ensure similarity_score is float and within 0..1
-                        try:
-                            similarity_score = float(similarity_score)
-                        except Exception:
-                            similarity_score = 0.0
-                        similarity_score = max(0.0, min(similarity_score, 1.0))
-                        
-                        results.append({
-                            "id": row[0],
-                            "name": row[1],
-                            "skills": json.loads(row[2]) if row[2] else [],
-                            "experience": row[3] or "",
-                            "education": row[4] or "",
-                            "contact": json.loads(row[5]) if row[5] else {},
-                            "summary": row[6] or "",
-                            "similarity_score": similarity_score
-                        })
-                    except json.JSONDecodeError as e:
-                        print(f"Error parsing JSON for resume {row[0]}: {str(e)}")
-                        continue
-                
-            return results
-        except Exception as e:
-            print(f"Error in semantic search: {str(e)}")
-            return []
+                        # Error parsing location, use neutral similarity
+                        location_similarity = 0.5
+                        logger.debug("Error parsing location for resume %s, using similarity: %s", resume_id, location_similarity)
 
-    def search(self, query: str, location: str = None, experience_years: int = None, user_id: str = None) -> Dict[str, Any]:
-        """Main search function that combines semantic search with RAG."""
-        try:
-            print(f"\nStarting search for query: {query}")
-            if not user_id:
-                raise ValueError("user_id is required for search")
-            
-            # Create query embedding
-            query_embedding = self.model.encode(query)
-            
-            with self.engine.connect() as conn:
-                # Build base query with user_id filter
-                base_query = text("""
-                    SELECT id, name, skills, experience, education, contact, summary, embedding, 
-                           certifications, work_history
-                    FROM resumes
-                    WHERE embedding IS NOT NULL
-                    AND user_id = :user_id
-                """)
-                
-                # Execute query
-                result = conn.execute(base_query, {"user_id": user_id})
-                rows = result.fetchall()
-                print(f"Found {len(rows)} resumes for user {user_id}")
-                
-                if not rows:
-                    print("No resumes found for user")
-                    return {
-                        "matches": [],
-                        "analysis": "No resumes found in your database."
-                    }
-                
-                # Calculate similarities
-                similarities = []
-                for row in rows:
-                    try:
-                        resume_id, name, skills, experience, education, contact, summary, emb_json, certs, work_hist = row
-                        if not emb_json:  # Skip if embedding is NULL
-                            print(f"Skipping resume {resume_id} due to NULL embedding")
-                            continue
-
-                        # Location-based similarity calculation (no skipping, include all)
-                        location_similarity = 1.0  # Default if no location filter
-                        if location:
-                            try:
-                                contact_dict = json.loads(contact) if isinstance(contact, str) else (contact or {})
-                                resume_location = contact_dict.get('location', '')
-                                if resume_location:
-                                    # Create embeddings for location comparison
-                                    query_location_embedding = self.model.encode(location)
-                                    resume_location_embedding = self.model.encode(resume_location)
-                                    location_similarity = np.dot(query_location_embedding, resume_location_embedding) / (
-                                        np.linalg.norm(query_location_embedding) * np.linalg.norm(resume_location_embedding)
-                                    )
-                                    print(f"Resume {resume_id} location similarity: {location_similarity:.4f}")
-                                else:
-                                    # No location in resume, reduce similarity
-                                    location_similarity = 0.3
-                                    print(f"Resume {resume_id} has no location, using similarity: {location_similarity}")
-                            except (json.JSONDecodeError, TypeError) as e:
-                                # Error parsing location, use neutral similarity
-                                location_similarity = 0.5
-                                print(f"Error parsing location for resume {resume_id}, using similarity: {location_similarity}")
-
-                        resume_embedding = np.array(json.loads(emb_json))
-
-                        # Calculate cosine similarity
-                        similarity = np.dot(query_embedding, resume_embedding) / (
-                            np.linalg.norm(query_embedding) * np.linalg.norm(resume_embedding)
-                        )
-
-                        # Parse skills and education
-                        skills_list = []
-                        if isinstance(skills, str):
-                            try:
-                                skills_list = json.loads(skills)
-                            except:
-                                skills_list = []
-                        elif isinstance(skills, list):
-                            skills_list = skills
-
-                        education = education or ""
-
-                        # Keyword matching for better accuracy
-                        query_lower = query.lower()
-                        education_lower = education.lower()
-                        skills_lower = [s.lower() for s in skills_list]
-                        summary_lower = (summary or "").lower()
-
-                        # Check for exact keyword matches
-                        keyword_matches = 0
-                        for keyword in query_lower.split():
-                            if (keyword in education_lower or
-                                any(keyword in skill for skill in skills_lower) or
-                                keyword in summary_lower):
-                                keyword_matches += 1
-
-                        # Strict skill matching: if no keyword matches, set similarity to 0
-                        if keyword_matches == 0:
-                            similarity = 0.0
-
-                        # Adjust similarity based on keyword matches
-                        if keyword_matches > 0:
-                            similarity += (keyword_matches * 0.1)  # Boost for each keyword match
-
-                        # Location-based boosting using cosine similarity with bounds 0 to 100
-                        if location:
-                            # Clamp similarity to 0-1 range before scaling
-                            clamped_location_similarity = max(0.0, min(location_similarity, 1.0))
-                            if clamped_location_similarity > 0.7:
-                                similarity += (clamped_location_similarity * 10)  # Boost scaled to max 10 (out of 100)
-                            elif clamped_location_similarity < 0.3:
-                                similarity *= 0.7  # Reduce similarity for poor location match
-
-                        # Experience-based filtering (stronger penalty for shortfall)
-                        if experience_years and experience:
-                            try:
-                                # Try to extract leading number of years from experience field
-                                exp_years = float(experience.split()[0])
-                                if exp_years < experience_years:
-                                    shortfall = experience_years - exp_years
-                                    # Apply an exponential penalty per missing year to reduce similarity more for larger gaps.
-                                    # Use base 0.4 (more aggressive than simple halving). Minimum penalty floor is 0.05.
-                                    penalty = max(0.05, (0.4 ** shortfall))
-                                    similarity *= penalty
-                            except Exception:
-                                # If parsing fails, apply a conservative penalty
-                                similarity *= 0.4
-
-                        # Only include results with meaningful similarity
-                        if similarity > 0.3:  # Minimum similarity threshold
-                            similarities.append((similarity, row))
+                # Location-based boosting using cosine similarity with bounds 0 to 100
+                if location:
+                    # Clamp similarity to 0-1 range before scaling
+                    clamped_location_similarity = max(0.0, min(location_similarity, 1.0))
+                    if clamped_location_similarity > 0.7:
+                        similarity += (clamped_location_similarity * 10)  # Boost scaled to max 10 (out of 100)
+                    elif clamped_location_similarity < 0.3:
+                        similarity *= 0.7  # Reduce similarity for poor location match
 
-                    except (json.JSONDecodeError, TypeError) as e:
-                        print(f"Error processing embedding for resume {row[0]}: {str(e)}")
-                        continue
-                
-                # Sort by similarity
-                similarities.sort(reverse=True)
-                
-                # Get top matches
-                matches = []
-                for similarity, row in similarities[:5]:  # Get top 5 matches
-                    # Clamp similarity to 0..1 and convert to float
+                # Experience-based filtering (stronger penalty for shortfall)
+                if experience_years and experience:
                     try:
-                        sim_val = float(similarity)
+                        # Try to extract leading number of years from experience field
+                        exp_years = float(experience.split()[0])
+                        if exp_years < experience_years:
+                            shortfall = experience_years - exp_years
+                            # Apply an exponential penalty per missing year to reduce similarity more for larger gaps.
+                            # Use base 0.4 (more aggressive than simple halving). Minimum penalty floor is 0.05.
+                            penalty = max(0.05, (0.4 ** shortfall))
+                            similarity *= penalty
                     except Exception:
-                        sim_val = 0.0
-                    sim_val = max(0.0, min(sim_val, 1.0))
-
-                    matches.append({
-                        "id": row[0],
-                        "name": row[1],
-                        "skills": row[2],
-                        "experience": row[3],
-                        "education": row[4],
-                        "contact": row[5],
-                        "summary": row[6],
-                        "certifications": row[8],
-                        "work_history": row[9],
-                        "similarity_score": sim_val
-                    })
-                
-                if not matches:
-                    return {
-                        "matches": [],
-                        "analysis": "No matching resumes found for your search criteria."
-                    }
-                
-                # Generate RAG response with detailed analysis
-                rag_response = self.generate_answer_with_rag(query, matches)
-                
-                return {
-                    "matches": matches,
-                    "analysis": rag_response
-                }
-                    
-        except Exception as e:
-            print(f"Error in search: {str(e)}")
-            return {
-                "matches": [],
-                "analysis": f"Error performing search: {str(e)}"
-            }
+                        # If parsing fails, apply a conservative penalty
+                        similarity *= 0.4
 
-    def generate_answer_with_rag(self, query: str, top_resumes: List[Dict[str, Any]]) -> str:
-        """Generate a response using RAG with the top matching resumes."""
-        if not top_resumes:
-            return "No matching resumes found."
-            
-        context = "\n\n".join([
-            f"Name: {r['name']}\n"
-            f"Summary: {r['summary']}\n"
-            f"Skills: {', '.join(json.loads(r['skills']) if isinstance(r['skills'], str) else r['skills'])}\n"
-            f"Experience: {r['experience']}\n"
-            f"Education: {r['education']}\n"
-            f"Certifications: {', '.join(json.loads(r['certifications']) if isinstance(r['certifications'], str) else r['certifications'])}\n"
-            f"Work History: {json.dumps(json.loads(r['work_history']) if isinstance(r['work_history'], str) else r['work_history'])}"
-            for r in top_resumes
-        ])
-        
-        prompt = f"""You are a helpful assistant helping recruiters find suitable candidates.
-        
-        User query: "{query}"
+                # Only include results with meaningful similarity
+                if similarity > 0.3:  # Minimum similarity threshold
+                    kept_scores.append(similarity)
+                    kept_rows.append(row)
 
-        Resume database (top matches):
-        {context}
+            except (json.JSONDecodeError, TypeError) as e:
+                logger.warning("Error processing resume %s: %s", row[0], e)
+                continue
 
-        Based on the above, provide a detailed analysis:
-        1. Best matches (with reasoning)
-        2. Why they match the requirements
-        3. Key qualifications and experience
-        4. Any potential concerns or missing qualifications
-        5. Recommendations for next steps
-        
-        Format your response in a clear, structured way.
-        """
+        if not kept_rows:
+            return []
+
+        # Select the top_k without sorting every candidate
+        scores = np.asarray(kept_scores, dtype=np.float64)
+        k = min(top_k, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
         
+        # Get top matches, with similarity clamped to 0..1
+        top_scores = np.clip(scores[top], 0.0, 1.0).tolist()
+        matches = []
+        for position, sim_val in zip(top.tolist(), top_scores):
+            row = kept_rows[position]
+            matches.append({
+                "id": row[0],
+                "name": row[1],
+                "skills": row[2],
+                "experience": row[3],
+                "education": row[4],
+                "contact": row[5],
+                "summary": row[6],
+                "similarity_score": sim_val
+            })
+
+        return matches
+
+    def _encode_locations(self, locations: List[str]) -> Dict[str, np.ndarray]:
+        """Return normalised embeddings for the given location strings, encoding the
+        ones not seen before in a single batch."""
+        found, missing = {}, []
+        with self._location_embeddings_lock:
+            for loc in {loc for loc in locations if loc}:
+                embedding = self._location_embeddings.get(loc)
+                if embedding is None:
+                    missing.append(loc)
+                else:
+                    found[loc] = embedding
+        if missing:
+            # Encode outside the lock so concurrent searches are not serialised on the model
+            embeddings = self.model.encode(missing, batch_size=64, convert_to_numpy=True, normalize_embeddings=True)
+            with self._location_embeddings_lock:
+                for loc, embedding in zip(missing, embeddings):
+                    found[loc] = self._location_embeddings[loc] = embedding.astype(np.float32)
+        return found
+
+    def _get_user_index(self, conn, user_id: str) -> UserIndex:
+        """Return the user's embedding index, rebuilding it when the stored resumes changed."""
+        signature = tuple(conn.execute(_INDEX_SIGNATURE_SQL, {"user_id": user_id}).fetchone())
+
+        index = self._user_indexes.get(user_id)
+        if (index is not None and index.signature == signature
+                and time.monotonic() - index.built_at < INDEX_TTL_SECONDS):
+            return index
+
+        index = self._build_user_index(conn, user_id, signature)
+        self._user_indexes[user_id] = index
+        return index
+
+    def _build_user_index(self, conn, user_id: str, signature: tuple) -> UserIndex:
+        """Load a user's embeddings into one contiguous, L2-normalised float32 matrix."""
+        # Stream rows (server-side cursor) so only the parsed metadata is held, not the
+        # whole raw result set
+        result = conn.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE).execute(
+            _INDEX_ROWS_SQL, {"user_id": user_id}
+        )
+        metadata = []
+        content_digest = hashlib.blake2b(digest_size=8)
+        for row in result:
+            metadata.append(row)
+            content_digest.update(f"{row[0]}:{row[7]},".encode())
+        version = content_digest.hexdigest()
+
+        persisted = self._load_persisted_matrix(user_id, version)
+        if persisted is not None:
+            ids, matrix = persisted[0].tolist(), persisted[1]
+        else:
+            ids, matrix = self._load_matrix(conn, user_id)
+            if ids:
+                self._persist_matrix(user_id, version, ids, matrix)
+
+        # Rows whose embedding failed to decode are not in the matrix; a row inserted
+        # after the metadata was read is not in the metadata
+        by_id = {row[0]: row for row in metadata}
+        if any(resume_id not in by_id for resume_id in ids):
+            keep = [position for position, resume_id in enumerate(ids) if resume_id in by_id]
+            ids, matrix = [ids[position] for position in keep], np.ascontiguousarray(matrix[keep])
+
+        rows = []
+        postings: Dict[str, List[int]] = {}
+        for resume_id in ids:
+            row = by_id[resume_id]
+            # JSON columns are parsed once here rather than per search hit
+            rows.append((
+                row[0], row[1], parse_json_column(row[2], []), row[3], row[4],
+                parse_json_column(row[5], {}), row[6]
+            ))
+            skills = rows[-1][2] if isinstance(rows[-1][2], list) else []
+            terms = set((row[4] or "").lower().split()) | set((row[6] or "").lower().split())
+            for skill in skills:
+                if isinstance(skill, str):
+                    terms.update(skill.lower().split())
+            for term in terms:
+                postings.setdefault(term, []).append(len(rows) - 1)
+
+        if not ids:
+            matrix = np.empty((0, 0), dtype=np.float32)
+
+        ann = self._load_or_build_ann(user_id, matrix) if len(rows) >= ANN_MIN_ROWS else None
+        postings = {term: np.asarray(positions, dtype=np.int64) for term, positions in postings.items()}
+        return UserIndex(np.asarray(ids, dtype=np.int64), matrix, rows, postings, signature, ann)
+
+    def _load_matrix(self, conn, user_id: str) -> Tuple[List[int], np.ndarray]:
+        """Fetch and decode a user's embeddings, skipping invalid ones."""
+        result = conn.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE).execute(
+            _INDEX_EMBEDDINGS_SQL, {"user_id": user_id}
+        )
+        ids, vectors = [], []
+        for resume_id, embedding in result:
+            try:
+                vector = decode_embedding(embedding)
+            except (TypeError, ValueError) as e:
+                logger.warning("Skipping resume %s due to invalid embedding: %s", resume_id, e)
+                continue
+            if not vector.size:
+                continue
+            ids.append(resume_id)
+            vectors.append(vector)
+
+        if not vectors:
+            return [], np.empty((0, 0), dtype=np.float32)
+        matrix = np.ascontiguousarray(np.stack(vectors), dtype=np.float32)
+        # New embeddings are stored normalised; this corrects quantization error
+        # and rows written before normalisation, once per build
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1.0, norms)
+        return ids, matrix
+
+    def _matrix_paths(self, user_id: str, version: str) -> Tuple[Path, Path]:
+        """Paths of the ids and matrix saved for a version of a user's embeddings."""
+        stem = f"{_ann_user_key(user_id)}_{version}"
+        return FAISS_INDEX_DIR / f"{stem}_ids.npy", FAISS_INDEX_DIR / f"{stem}_matrix.npy"
+
+    def _load_persisted_matrix(self, user_id: str, version: str):
+        """Return (ids, read-only memory-mapped matrix) saved for this version, or None."""
+        ids_path, matrix_path = self._matrix_paths(user_id, version)
         try:
-            response, _ = call_groq(prompt)
-            return response
-        except Exception as e:
-            print(f"Error generating RAG response: {str(e)}")
-            return "Error generating analysis. Please try again."
+            ids = np.load(ids_path)
+            matrix = np.load(matrix_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if matrix.dtype != np.float32 or matrix.ndim != 2 or matrix.shape[0] != len(ids):
+            return None
+        return ids, matrix
 
-    def clear_index(self, user_id: str = None):
-        """Clear all resumes from the database for a specific user."""
+    def _persist_matrix(self, user_id: str, version: str, ids: List[int], matrix: np.ndarray):
+        """Save a freshly built matrix for later builds, replacing the user's older copies."""
+        ids_path, matrix_path = self._matrix_paths(user_id, version)
         try:
-            with self.engine.connect() as conn:
-                if user_id:
-                    conn.execute(text("DELETE FROM resumes WHERE user_id = :user_id"), {"user_id": user_id})
-                else:
-                    conn.execute(text("DELETE FROM resumes"))
-        except Exception as e:
-            print(f"Error clearing index: {str(e)}")
-            raise
+            FAISS_INDEX_DIR.mkdir(parents=True, exist_ok=True)
+            self._discard_persisted_matrix(user_id)
+            # Write to unique temporary names and rename, so readers never map a partial
+            # file and concurrent builds never share one; the matrix goes last since
+            # loading requires both
+            for path, array in ((ids_path, np.asarray(ids, dtype=np.int64)), (matrix_path, matrix)):
+                fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        np.save(f, array)
+                    os.replace(tmp_name, path)
+                except OSError:
+                    Path(tmp_name).unlink(missing_ok=True)
+                    raise
+        except OSError as e:
+            logger.error("Error persisting embedding matrix for user %s: %s", user_id, e)
+
+    def _discard_persisted_matrix(self, user_id: str):
+        """Remove the user's saved matrices; workers that mapped one keep their mapping."""
+        try:
+            for path in FAISS_INDEX_DIR.glob(f"{_ann_user_key(user_id)}_*.npy"):
+                path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.error("Error removing embedding matrix for user %s: %s", user_id, e)
+
+    def _load_or_build_ann(self, user_id: str, matrix: np.ndarray):
+        """Return an int8 HNSW index over matrix, reusing the copy persisted for the same vectors."""
+        user_key = _ann_user_key(user_id)
+        digest = hashlib.blake2b(matrix.tobytes(), digest_size=8).hexdigest()
+        path = FAISS_INDEX_DIR / f"{user_key}_sq8_{digest}.index"
+
+        if path.exists():
+            try:
+                ann = faiss.read_index(str(path), faiss.IO_FLAG_MMAP)
+            except RuntimeError:
+                ann = faiss.read_index(str(path))
+        else:
+            ann = faiss.IndexHNSWSQ(
+                matrix.shape[1], faiss.ScalarQuantizer.QT_8bit, HNSW_M, faiss.METRIC_INNER_PRODUCT
+            )
+            ann.train(matrix)
+            ann.add(matrix)
+            try:
+                FAISS_INDEX_DIR.mkdir(parents=True, exist_ok=True)
+                for stale in FAISS_INDEX_DIR.glob(f"{user_key}_*.index"):
+                    stale.unlink(missing_ok=True)
+                faiss.write_index(ann, str(path))
+            except OSError as e:
+                logger.error("Error persisting FAISS index for user %s: %s", user_id, e)
+
+        ann.hnsw.efSearch = HNSW_EF_SEARCH
+        return ann
+
+    def invalidate_user_index(self, user_id: str = None):
+        """Drop the cached index for a user, or for every user when user_id is None."""
+        if user_id is None:
+            self._user_indexes.clear()
+        else:
+            self._user_indexes.pop(user_id, None)
+
+    def drop_user_index(self, user_id: str):
+        """Forget everything held for a user whose resumes were deleted: the cached
+        index and the HNSW index and matrix persisted on disk."""
+        self.invalidate_user_index(user_id)
+        try:
+            for path in FAISS_INDEX_DIR.glob(f"{_ann_user_key(user_id)}_*"):
+                path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.error("Error removing FAISS index for user %s: %s", user_id, e)
 
     def verify_database(self):
         """Verify database state and fix any issues."""
         try:
             with self.engine.connect() as conn:
                 # Check for resumes without embeddings
-                result = conn.execute(text("""
-                    SELECT id, name FROM resumes 
-                    WHERE embedding IS NULL OR embedding = ''
-                """))
-                missing_embeddings = result.fetchall()
-                
-                if missing_embeddings:
-                    print(f"Found {len(missing_embeddings)} resumes without embeddings")
-                    for resume_id, name in missing_embeddings:
-                        try:
-                            # Get resume data
-                            result = conn.execute(text("""
-                                SELECT name, skills, experience, education, contact, summary 
-                                FROM resumes WHERE id = :id
-                            """), {"id": resume_id})
-                            resume_data = result.fetchone()
-                            
-                            if resume_data:
-                                # Parse contact for location
-                                location = ""
-                                try:
-                                    contact_dict = json.loads(resume_data[4]) if resume_data[4] else {}
-                                    location = contact_dict.get('location', '')
-                                except:
-                                    pass
-
-                                # Create embedding text
-                                embedding_text = f"""
-                                Name: {resume_data[0]}
-                                Summary: {resume_data[5] or ''}
-                                Skills: {resume_data[1] or '[]'}
-                                Experience: {resume_data[2] or ''}
-                                Education: {resume_data[3] or ''}
-                                Location: {location}
-                                """
-                                
-                                # Generate embedding
-                                embedding = self.model.encode(embedding_text)
-                                embedding_list = embedding.tolist()
-                                
-                                # Update embedding
-                                conn.execute(text("""
-                                    UPDATE resumes 
-                                    SET embedding = :embedding 
-                                    WHERE id = :id
-                                """), {
-                                    "embedding": json.dumps(embedding_list),
-                                    "id": resume_id
-                                })
-                        except Exception as e:
-                            print(f"Error fixing resume {resume_id}: {str(e)}")
-                            continue
-                
+                missing_embeddings = conn.execute(_MISSING_EMBEDDINGS_SQL).fetchall()
+            if not missing_embeddings:
                 return True
+            logger.info("Found %d resumes without embeddings", len(missing_embeddings))
+
+            # Create embedding texts, longest first so each batch pads to similar lengths
+            texts = [
+                (resume_id, f"""
+                Name: {name}
+                Summary: {summary or ''}
+                Skills: {skills or '[]'}
+                Experience: {experience or ''}
+                Education: {education or ''}
+                Location: {_contact_location(contact)}
+                """)
+                for resume_id, name, skills, experience, education, contact, summary in missing_embeddings
+            ]
+            texts.sort(key=lambda item: len(item[1]), reverse=True)
+
+            # Generate all embeddings in batches, then write them back in one executemany
+            embeddings = self.model.encode(
+                [embedding_text for _, embedding_text in texts],
+                batch_size=VERIFY_ENCODE_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+            with self.engine.begin() as conn:
+                conn.execute(_UPDATE_EMBEDDING_SQL, [
+                    {"embedding": encode_embedding(embedding), "id": resume_id}
+                    for (resume_id, _), embedding in zip(texts, embeddings)
+                ])
+
+            self.invalidate_user_index()
+            return True
         except Exception as e:
-            print(f"Error verifying database: {str(e)}")
+            logger.error("Error verifying database: %s", e)
             raise 
\ No newline at end of file
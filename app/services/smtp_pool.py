@@ -0,0 +1,45 @@
+import asyncio
+from email.message import Message
+
+import aiosmtplib
+
+
+class SMTPPool:
+    """Keep up to `size` authenticated SMTP connections open and reuse them across sends."""
+
+    def __init__(self, hostname: str, port: int, username: str, password: str, size: int = 4):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(size)
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        # connect() runs STARTTLS and LOGIN since start_tls and credentials are set
+        client = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            start_tls=True,
+            timeout=30
+        )
+        await client.connect()
+        return client
+
+    async def send_message(self, message: Message):
+        """Send on an idle connection, opening one if none is free; a connection the
+        server already dropped is replaced once before giving up."""
+        async with self._slots:
+            client = self._idle.get_nowait() if not self._idle.empty() else await self._connect()
+            try:
+                try:
+                    await client.send_message(message)
+                except aiosmtplib.SMTPServerDisconnected:
+                    client = await self._connect()
+                    await client.send_message(message)
+            except Exception:
+                client.close()
+                raise
+            self._idle.put_nowait(client)
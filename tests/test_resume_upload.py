@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+os.environ.setdefault("S3_BUCKET", "test-bucket")
+
+import boto3
+from botocore.stub import ANY, Stubber
+
+from app.services.aws import S3_TRANSFER_CONFIG, NonClosingFile
+
+
+def test_upload_handle_readable_after_upload_fileobj():
+    client = boto3.client(
+        "s3",
+        region_name="ap-south-1",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing"
+    )
+    content = b"%PDF-1.4 resume"
+    upload = tempfile.SpooledTemporaryFile()
+    upload.write(content)
+    upload.seek(0)
+
+    with Stubber(client) as stubber:
+        stubber.add_response(
+            "put_object",
+            {},
+            {"Bucket": "test-bucket", "Key": "resumes/test.pdf", "Body": ANY, "ContentType": "application/pdf"}
+        )
+        client.upload_fileobj(
+            NonClosingFile(upload),
+            "test-bucket",
+            "resumes/test.pdf",
+            ExtraArgs={"ContentType": "application/pdf"},
+            Config=S3_TRANSFER_CONFIG
+        )
+        stubber.assert_no_pending_responses()
+
+    # upload_resume seeks back and parses the same handle after the upload
+    assert not upload.closed
+    upload.seek(0)
+    assert upload.read() == content